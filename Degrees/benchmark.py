@@ -0,0 +1,193 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import degrees
+
+# Search variants: (name, load_data keyword arguments, shortest_path keyword arguments)
+VARIANTS = [
+    ("bfs", {}, {}),
+    ("bidirectional", {}, {"bidirectional": True}),
+    ("compact", {"compact": True}, {}),
+    ("compact+components", {"components": True}, {})
+]
+
+# Percentiles reported for query latency
+PERCENTILES = [50, 90, 99]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark Degrees search variants on random pairs."
+    )
+    parser.add_argument("directories", nargs="*", default=["small", "large"])
+    parser.add_argument("--pairs", type=int, default=100,
+                        help="number of random person pairs per dataset")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--memory-pairs", type=int, default=10,
+                        help="pairs re-run under tracemalloc for peak memory")
+    parser.add_argument("--variant", action="append",
+                        choices=[name for name, _, _ in VARIANTS],
+                        help="only run these variants (default: all)")
+    parser.add_argument("--label", default="",
+                        help="version label stored with the results")
+    parser.add_argument("--output", default="benchmark.json")
+    args = parser.parse_args()
+    if args.pairs < 1:
+        parser.error("--pairs must be at least 1")
+
+    results = []
+    for directory in args.directories:
+        if not os.path.isdir(directory):
+            print(f"Skipping {directory}: no such directory", file=sys.stderr)
+            continue
+        pairs = None
+        for name, load_args, search_args in VARIANTS:
+            if args.variant and name not in args.variant:
+                continue
+            load = load_variant(directory, load_args)
+            if pairs is None:
+                pairs = random_pairs(args.pairs, args.seed)
+            result = run_variant(pairs, search_args, args.memory_pairs)
+            result.update(load)
+            result["dataset"] = directory
+            result["variant"] = name
+            results.append(result)
+            print(summary(result), file=sys.stderr)
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "label": args.label,
+            "python": platform.python_version(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "pairs": args.pairs,
+            "seed": args.seed,
+            "results": results
+        }, f, indent=2)
+    print(f"Results written to {args.output}.", file=sys.stderr)
+
+
+def reset():
+    """
+    Forget all data loaded into the degrees module.
+    """
+    degrees.names = {}
+    degrees.people = {}
+    degrees.movies = {}
+    degrees.graph = None
+
+
+def load_variant(directory, load_args):
+    """
+    Load `directory` for one variant, measuring time and memory.
+    """
+    reset()
+    tracemalloc.start()
+    start = time.perf_counter()
+    degrees.load_data(directory, **load_args)
+    seconds = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"load_seconds": seconds, "load_memory_bytes": size}
+
+
+def random_pairs(n, seed):
+    """
+    Return `n` (source, target) pairs of person ids drawn with `seed`.
+    """
+    rng = random.Random(seed)
+    person_ids = sorted(degrees.people)
+    return [
+        (rng.choice(person_ids), rng.choice(person_ids))
+        for _ in range(n)
+    ]
+
+
+def run_variant(pairs, search_args, memory_pairs):
+    """
+    Time every pair with the currently loaded data, then re-run the
+    first `memory_pairs` under tracemalloc for peak query memory.
+
+    Cached tables and search work are cleared before each pass, so the
+    re-run searches like the first run instead of building tables.
+    """
+    clear_tables()
+    latencies = []
+    explored = []
+    frontiers = []
+    connected = 0
+    for source, target in pairs:
+        stats = {}
+        start = time.perf_counter()
+        path = degrees.shortest_path(source, target, stats=stats, **search_args)
+        latencies.append(time.perf_counter() - start)
+        explored.append(stats["states_explored"])
+        frontiers.append(stats["peak_frontier"])
+        if path is not None:
+            connected += 1
+
+    clear_tables()
+    peak_memory = 0
+    for source, target in pairs[:memory_pairs]:
+        tracemalloc.start()
+        degrees.shortest_path(source, target, **search_args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_memory = max(peak_memory, peak)
+
+    return {
+        "queries": len(pairs),
+        "connected": connected,
+        "latency_ms": {
+            f"p{p}": percentile(latencies, p) * 1000 for p in PERCENTILES
+        },
+        "latency_ms_mean": sum(latencies) / len(latencies) * 1000,
+        "states_explored": describe(explored),
+        "peak_frontier": describe(frontiers),
+        "query_peak_memory_bytes": peak_memory
+    }
+
+
+def clear_tables():
+    """
+    Forget the compact graph's cached tables, if one is loaded.
+    """
+    if degrees.graph is not None:
+        degrees.graph.clear_tables()
+
+
+def percentile(values, p):
+    """
+    Return the nearest-rank `p`th percentile of `values`.
+    """
+    ordered = sorted(values)
+    rank = max(1, -(-p * len(ordered) // 100))
+    return ordered[rank - 1]
+
+
+def describe(values):
+    return {
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 50),
+        "max": max(values)
+    }
+
+
+def summary(result):
+    latency = result["latency_ms"]
+    return (
+        f"{result['dataset']:>8} {result['variant']:<20}"
+        f" p50 {latency['p50']:.3f}ms p99 {latency['p99']:.3f}ms"
+        f" explored {result['states_explored']['mean']:.1f}"
+        f" frontier {result['peak_frontier']['max']}"
+        f" load {result['load_seconds']:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
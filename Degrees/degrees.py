@@ -1,7 +1,18 @@
+import argparse
 import csv
+import json
+import mmap
+import multiprocessing
+import os
+import struct
 import sys
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 
-from util import Node, StackFrontier, QueueFrontier
+from graph import CompactGraph, ITEMSIZE
+from tables import NameIndex, Records, SortedIndex, StringTable
+from util import Node, DequeQueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,20 +23,59 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# After load_snapshot, these three are read-only mappings that build
+# each record on access from the memory-mapped snapshot
 
-def load_data(directory):
+# Integer-indexed co-star graph, set by load_data when compact=True
+graph = None
+
+# Binary snapshot written next to the CSV files
+SNAPSHOT_FILE = "degrees.snapshot"
+SNAPSHOT_MAGIC = b"DEGREES\0"
+SNAPSHOT_VERSION = 3
+
+# Magic, version, array layout, (mtime_ns, size) of each CSV file,
+# and the number of sections that follow
+SNAPSHOT_HEADER = struct.Struct("<8sII6QI4x")
+
+# Typecode of each section, in order: (offsets, blob) string tables of
+# person ids, names and births and of movie ids, titles and years; the
+# person id, movie id and lowercase name sort orders; the CSR arrays;
+# the component of each person and the size of each component
+SNAPSHOT_SECTIONS = ["q", "B"] * 6 + ["i"] * 3 + ["i"] * 4 + ["i"] * 2
+
+
+def load_data(directory, compact=False, snapshot=False, components=False):
     """
     Load data from CSV files into memory.
+
+    If `compact` is true, star links are kept only in a CompactGraph
+    rather than as sets inside `people` and `movies`.
+
+    If `snapshot` is true, load compact data from a binary snapshot
+    when one matches the CSV files, or write one after parsing them.
+
+    If `components` is true, also label the graph's connected
+    components so unconnected pairs are answered without a search.
+    A snapshot always stores them, so they are never recomputed.
     """
+    global graph
+
+    if snapshot and load_snapshot(directory):
+        return
+    if snapshot or components:
+        compact = True
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             people[row["id"]] = {
                 "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
+                "birth": row["birth"]
             }
+            if not compact:
+                people[row["id"]]["movies"] = set()
             if row["name"].lower() not in names:
                 names[row["name"].lower()] = {row["id"]}
             else:
@@ -37,13 +87,24 @@ def load_data(directory):
         for row in reader:
             movies[row["id"]] = {
                 "title": row["title"],
-                "year": row["year"],
-                "stars": set()
+                "year": row["year"]
             }
+            if not compact:
+                movies[row["id"]]["stars"] = set()
 
     # Load stars
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
+        if compact:
+            graph = CompactGraph.from_stars(
+                list(people), list(movies),
+                ((row["person_id"], row["movie_id"]) for row in reader)
+            )
+            if snapshot:
+                save_snapshot(directory)
+            if components and graph.component is None:
+                graph.find_components()
+            return
         for row in reader:
             try:
                 people[row["person_id"]]["movies"].add(row["movie_id"])
@@ -52,15 +113,282 @@ def load_data(directory):
                 pass
 
 
+def stream_data(directory, min_year=None, max_year=None, min_cast=1,
+                components=False):
+    """
+    Load a filtered compact graph, streaming each CSV file once.
+
+    Only movies released between `min_year` and `max_year` (inclusive,
+    either may be None) with at least `min_cast` stars are kept, and only
+    people who starred in a kept movie alongside someone else; people
+    with no co-stars can never be on a path. Records hold just the
+    fields used to resolve names and print paths.
+    """
+    global graph
+
+    # Keep titles of movies in the year range
+    titles = {}
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        columns = next(reader)
+        id_col = columns.index("id")
+        title_col = columns.index("title")
+        year_col = columns.index("year")
+        for row in reader:
+            if min_year is not None or max_year is not None:
+                try:
+                    year = int(row[year_col])
+                except ValueError:
+                    continue
+                if min_year is not None and year < min_year:
+                    continue
+                if max_year is not None and year > max_year:
+                    continue
+            titles[row[id_col]] = row[title_col]
+
+    # Intern star links to kept movies, counting each movie's cast
+    movie_index = {}
+    person_index = {}
+    edge_people = array("i")
+    edge_movies = array("i")
+    cast = array("i")
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        columns = next(reader)
+        person_col = columns.index("person_id")
+        movie_col = columns.index("movie_id")
+        for row in reader:
+            movie_id = row[movie_col]
+            if movie_id not in titles:
+                continue
+            m = movie_index.get(movie_id)
+            if m is None:
+                m = movie_index[movie_id] = len(movie_index)
+                cast.append(0)
+            p = person_index.get(row[person_col])
+            if p is None:
+                p = person_index[row[person_col]] = len(person_index)
+            edge_people.append(p)
+            edge_movies.append(m)
+            cast[m] += 1
+
+    # Keep only people who appear in a kept movie
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        columns = next(reader)
+        id_col = columns.index("id")
+        name_col = columns.index("name")
+        birth_col = columns.index("birth")
+        for row in reader:
+            if row[id_col] not in person_index:
+                continue
+            people[row[id_col]] = {
+                "name": row[name_col],
+                "birth": row[birth_col]
+            }
+            names.setdefault(row[name_col].lower(), set()).add(row[id_col])
+
+    # Renumber the surviving movies, then the people starring in them
+    movie_ids = [None] * len(movie_index)
+    for movie_id, m in movie_index.items():
+        movie_ids[m] = movie_id
+    movie_map = array("i", [-1]) * len(movie_ids)
+    kept_movies = []
+    for m, movie_id in enumerate(movie_ids):
+        if cast[m] >= min_cast:
+            movie_map[m] = len(kept_movies)
+            kept_movies.append(movie_id)
+            movies[movie_id] = {"title": titles[movie_id]}
+
+    # Flag people with a co-star in some kept movie
+    starred = bytearray(len(person_index))
+    for p, m in zip(edge_people, edge_movies):
+        if movie_map[m] != -1 and cast[m] >= 2:
+            starred[p] = 1
+
+    person_map = array("i", [-1]) * len(person_index)
+    kept_people = []
+    for person_id, p in person_index.items():
+        if person_id not in people:
+            continue
+        if not starred[p]:
+            # This person has no co-star in any kept movie
+            name = people.pop(person_id)["name"].lower()
+            names[name].discard(person_id)
+            if not names[name]:
+                del names[name]
+            continue
+        person_map[p] = len(kept_people)
+        kept_people.append(person_id)
+
+    kept_edge_people = array("i")
+    kept_edge_movies = array("i")
+    for p, m in zip(edge_people, edge_movies):
+        p = person_map[p]
+        m = movie_map[m]
+        if p != -1 and m != -1:
+            kept_edge_people.append(p)
+            kept_edge_movies.append(m)
+
+    graph = CompactGraph.from_edges(
+        kept_people, kept_movies, kept_edge_people, kept_edge_movies
+    )
+    if components:
+        graph.find_components()
+
+
+def snapshot_key(directory):
+    """
+    Identify the CSV files by their modification times and sizes,
+    along with the array layout of this platform.
+    """
+    key = [ITEMSIZE | (256 if sys.byteorder == "little" else 0)]
+    for filename in ("people.csv", "movies.csv", "stars.csv"):
+        stat = os.stat(os.path.join(directory, filename))
+        key.extend([stat.st_mtime_ns, stat.st_size])
+    return key
+
+
+def save_snapshot(directory):
+    """
+    Write the loaded compact data to a snapshot in `directory`.
+
+    After a fixed header come SNAPSHOT_SECTIONS: string tables of the
+    records' fields, index sort orders, the graph's CSR arrays and
+    its components, each aligned so it can be memory-mapped and used
+    in place. Components are labelled first if they are not yet.
+    """
+    if graph.component is None:
+        graph.find_components()
+
+    person_ids = graph.person_ids
+    movie_ids = graph.movie_ids
+    person_names = [people[person_id]["name"] for person_id in person_ids]
+
+    sections = []
+    for strings in (
+        person_ids,
+        person_names,
+        [people[person_id]["birth"] for person_id in person_ids],
+        movie_ids,
+        [movies[movie_id]["title"] for movie_id in movie_ids],
+        [movies[movie_id]["year"] for movie_id in movie_ids]
+    ):
+        sections.extend(StringTable.pack(strings))
+    sections.append(SortedIndex.sort(person_ids))
+    sections.append(SortedIndex.sort(movie_ids))
+    sections.append(SortedIndex.sort(person_names, str.lower))
+    sections.extend(graph.arrays())
+    sections.extend([graph.component, graph.component_sizes])
+    data = [bytes(section) for section in sections]
+
+    path = os.path.join(directory, SNAPSHOT_FILE)
+    try:
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(
+                SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+                *snapshot_key(directory), len(data)
+            ))
+            f.write(struct.pack(f"<{len(data)}Q", *(len(d) for d in data)))
+            for d in data:
+                f.write(d)
+                f.write(b"\0" * (-f.tell() % 8))
+        os.replace(f"{path}.tmp", path)
+    except OSError:
+        pass
+
+
+def load_snapshot(directory):
+    """
+    Load compact data from the snapshot in `directory`.
+
+    Returns False if there is no snapshot or it does not match
+    the current CSV files, which is checked from the header alone.
+    Nothing else is parsed: `names`, `people`, `movies` and the graph
+    read records straight from the memory-mapped file as needed.
+    """
+    global graph, names, people, movies
+
+    path = os.path.join(directory, SNAPSHOT_FILE)
+    try:
+        with open(path, "rb") as f:
+            magic, version, *key, count = SNAPSHOT_HEADER.unpack(
+                f.read(SNAPSHOT_HEADER.size)
+            )
+            if (magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION
+                    or key != snapshot_key(directory)
+                    or count != len(SNAPSHOT_SECTIONS)):
+                return False
+            lengths = struct.unpack(f"<{count}Q", f.read(8 * count))
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, struct.error, ValueError):
+        return False
+
+    view = memoryview(buffer)
+    offset = SNAPSHOT_HEADER.size + 8 * count
+    sections = []
+    for typecode, length in zip(SNAPSHOT_SECTIONS, lengths):
+        offset += -offset % 8
+        if offset + length > len(view):
+            return False
+        sections.append(view[offset:offset + length].cast(typecode))
+        offset += length
+
+    person_ids, person_names, births, movie_ids, titles, years = [
+        StringTable(sections[i], sections[i + 1]) for i in range(0, 12, 2)
+    ]
+    person_index = SortedIndex(person_ids, sections[12])
+    movie_index = SortedIndex(movie_ids, sections[13])
+    name_index = SortedIndex(person_names, sections[14], str.lower)
+
+    names = NameIndex(person_ids, name_index)
+    people = Records(person_ids, person_index,
+                     {"name": person_names, "birth": births})
+    movies = Records(movie_ids, movie_index,
+                     {"title": titles, "year": years})
+    graph = CompactGraph(person_ids, movie_ids, *sections[15:19],
+                         person_index=person_index, movie_index=movie_index)
+    graph.component, graph.component_sizes = sections[19:21]
+    return True
+
+
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        usage="python degrees.py [directory] [--batch FILE | --serve PORT]"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--batch", metavar="FILE",
+                      help="answer source,target pairs from FILE ('-' for stdin)")
+    mode.add_argument("--serve", metavar="PORT", type=int,
+                      help="answer queries over HTTP on localhost:PORT")
+    parser.add_argument("--min-year", type=int,
+                        help="only load movies released in or after this year")
+    parser.add_argument("--max-year", type=int,
+                        help="only load movies released in or before this year")
+    parser.add_argument("--min-cast", type=int, default=1,
+                        help="only load movies with at least this many stars")
+    args = parser.parse_args()
 
     # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    print("Loading data...", file=sys.stderr)
+    if args.min_year is None and args.max_year is None and args.min_cast <= 1:
+        load_data(args.directory, snapshot=True, components=True)
+    else:
+        stream_data(args.directory, args.min_year, args.max_year,
+                    args.min_cast, components=True)
+    print("Data loaded.", file=sys.stderr)
+
+    if args.batch is not None:
+        if args.batch == "-":
+            run_batch(sys.stdin, sys.stdout)
+        else:
+            with open(args.batch, encoding="utf-8") as f:
+                run_batch(f, sys.stdout)
+        return
+    if args.serve is not None:
+        serve(args.serve)
+        return
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -69,7 +397,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, bidirectional=True)
 
     if path is None:
         print("Not connected.")
@@ -84,19 +412,127 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def query(source_name, target_name):
+    """
+    Answer a single query between two people given by name
+    (or by IMDB id, to settle ambiguous names).
+
+    Returns a JSON-serializable dict with the degrees of separation
+    and path, or with an error message.
+    """
+    result = {"source": source_name, "target": target_name}
+    ids = []
+    for name in (source_name, target_name):
+        person_id = person_id_for_name(name, interactive=False)
+        if person_id is None and name in people:
+            person_id = name
+        if person_id is None:
+            candidates = sorted(names.get(name.lower(), set()))
+            if candidates:
+                result["error"] = f"Ambiguous name: {name}"
+                result["candidates"] = candidates
+            else:
+                result["error"] = f"Person not found: {name}"
+            return result
+        ids.append(person_id)
+
+    path = shortest_path(ids[0], ids[1], bidirectional=True)
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+        return result
+
+    result["degrees"] = len(path)
+    result["path"] = [
+        {
+            "movie_id": movie_id,
+            "movie": movies[movie_id]["title"],
+            "person_id": person_id,
+            "person": people[person_id]["name"]
+        }
+        for movie_id, person_id in path
+    ]
+    return result
+
+
+def run_batch(lines, out):
+    """
+    Read `source,target` name pairs from `lines` and write one JSON
+    result per pair to `out` as soon as it is computed.
+    """
+    for row in csv.reader(lines):
+        if not row or not "".join(row).strip():
+            continue
+        if len(row) != 2:
+            result = {"error": f"Expected source,target: {','.join(row)}"}
+        else:
+            result = query(row[0].strip(), row[1].strip())
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    Answer `GET /path?source=NAME&target=NAME` with a JSON result.
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path != "/path" or "source" not in params or "target" not in params:
+            self.send_json(400, {"error": "Usage: /path?source=NAME&target=NAME"})
+            return
+        result = query(params["source"][0], params["target"][0])
+        self.send_json(400 if "error" in result else 200, result)
+
+    def send_json(self, status, result):
+        body = json.dumps(result).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(port):
+    """
+    Keep the loaded data resident and answer queries until interrupted.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), QueryHandler)
+    print(f"Serving on http://127.0.0.1:{port}/path", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def shortest_path(source, target, bidirectional=False, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    If `bidirectional` is true, search from both ends at once.
+    When a compact graph is loaded, it is always searched instead.
+
+    If `stats` is a dict, the number of states explored and the
+    peak frontier size are stored in it.
+
     If no possible path, returns None.
     """
+    if graph is not None:
+        return compact_path(source, target, stats)
+    if bidirectional:
+        return bidirectional_path(source, target, stats)
+
 # Keep track of number of states explored
     num_states_explored = 0
+    peak_frontier = 1
 
     # Initialize frontier to just the starting position
     start = Node(state=source, parent=None, action=None)
-    frontier = QueueFrontier()
+    frontier = DequeQueueFrontier()
     frontier.add(start)
 
     # Initialize an empty explored set
@@ -107,7 +543,8 @@ def shortest_path(source, target):
 
     # If nothing left in frontier, then no path
         if frontier.empty():
-            raise Exception("None")
+            record_search(stats, num_states_explored, peak_frontier)
+            return None
 
         # Choose a node from the frontier
         node = frontier.remove()
@@ -127,6 +564,7 @@ def shortest_path(source, target):
             #actions.reverse()
             #cells.reverse()
             solutions.reverse()
+            record_search(stats, num_states_explored, peak_frontier)
             return solutions
 
         # Mark node as explored
@@ -137,18 +575,210 @@ def shortest_path(source, target):
             if not frontier.contains_state(state) and state not in states_explored:
                 child = Node(state=state, parent=node, action=action)
                 frontier.add(child)
+        peak_frontier = max(peak_frontier, len(frontier.frontier))
+
+
+
+def bidirectional_path(source, target, stats=None):
+    """
+    Breadth-first search expanding from the source and the target
+    at the same time until the two searches meet.
+
+    Returns the same (movie_id, person_id) pairs as `shortest_path`,
+    or None if there is no path.
+    """
+    if source == target:
+        record_search(stats, 0, 0)
+        return []
+
+    # Map each reached person to the (movie_id, person_id) step that led there
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+    num_states_explored = 0
+    peak_frontier = 2
+
+    while forward_frontier and backward_frontier:
+
+        # Always grow the smaller side by one full level
+        if len(forward_frontier) <= len(backward_frontier):
+            num_states_explored += len(forward_frontier)
+            forward_frontier, meeting = expand_level(
+                forward_frontier, forward, backward
+            )
+        else:
+            num_states_explored += len(backward_frontier)
+            backward_frontier, meeting = expand_level(
+                backward_frontier, backward, forward
+            )
+        peak_frontier = max(
+            peak_frontier, len(forward_frontier) + len(backward_frontier)
+        )
+
+        if meeting is not None:
+            record_search(stats, num_states_explored, peak_frontier)
+            return join_paths(meeting, forward, backward)
+
+    record_search(stats, num_states_explored, peak_frontier)
+    return None
+
+
+def record_search(stats, states_explored, peak_frontier):
+    """
+    Store search counters in `stats`, if a dict was given.
+    """
+    if stats is not None:
+        stats["states_explored"] = states_explored
+        stats["peak_frontier"] = peak_frontier
+
+
+def compact_path(source, target, stats=None):
+    """
+    Search the compact graph, translating ids to and from indices.
+    """
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+    if not graph.maybe_connected(source, target):
+        record_search(stats, 0, 0)
+        return None
+
+    path = graph.path_between(source, target, stats)
+    if path is None:
+        return None
+    return [(graph.movie_ids[m], graph.person_ids[p]) for m, p in path]
+
 
+def distances_from(person_id):
+    """
+    Returns a dict mapping every person reachable from `person_id`
+    to their degrees of separation, computed in one search.
+
+    Requires a compact graph. The table is cached, so later
+    shortest_path queries from or to this person follow predecessors
+    instead of searching.
+    """
+    distance, _, _ = graph.distance_table(graph.person_index[person_id])
+    return {
+        graph.person_ids[p]: d
+        for p, d in enumerate(distance)
+        if d != -1
+    }
+
+
+def predecessors_from(person_id):
+    """
+    Returns a dict mapping every person reachable from `person_id`,
+    other than themselves, to the (movie_id, person_id) step reaching
+    them on a shortest path from `person_id`.
 
+    Requires a compact graph, and shares its cached table with
+    distances_from.
+    """
+    distance, parent_person, parent_movie = graph.distance_table(
+        graph.person_index[person_id]
+    )
+    return {
+        graph.person_ids[p]: (
+            graph.movie_ids[parent_movie[p]],
+            graph.person_ids[parent_person[p]]
+        )
+        for p, d in enumerate(distance)
+        if d > 0
+    }
+
+
+def component_size(person_id):
+    """
+    Returns the number of people connected to `person_id`, including
+    themselves. Requires data loaded with components=True.
+    """
+    p = graph.person_index[person_id]
+    return graph.component_sizes[graph.component[p]]
+
+
+def expand_level(frontier, parents, other_parents):
+    """
+    Expand every person in `frontier` by one step, recording parents.
 
-def person_id_for_name(name):
+    Returns the next frontier and the first person also reached by the
+    other search, or None if the searches have not met yet.
+    """
+    next_frontier = []
+    for person_id in frontier:
+        for movie_id, neighbor in neighbors_for_person(person_id):
+            if neighbor in parents:
+                continue
+            parents[neighbor] = (movie_id, person_id)
+            if neighbor in other_parents:
+                return next_frontier, neighbor
+            next_frontier.append(neighbor)
+    return next_frontier, None
+
+
+def join_paths(meeting, forward, backward):
+    """
+    Build the path through `meeting` from the two searches' parents.
+    """
+    path = []
+    person_id = meeting
+    while forward[person_id] is not None:
+        movie_id, previous = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = previous
+    path.reverse()
+
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, following = backward[person_id]
+        path.append((movie_id, following))
+        person_id = following
+    return path
+
+
+def shortest_paths(pairs, workers=None):
+    """
+    Returns `shortest_path(source, target)` for every (source, target)
+    pair, in the same order as `pairs`.
+
+    Pairs are spread over a pool of `workers` processes (default: one
+    per CPU). Workers are forked after the data is loaded, so they
+    share `people`, `movies` and the graph copy-on-write instead of
+    receiving pickled copies; only the pairs and paths are sent
+    between processes.
+    """
+    pairs = list(pairs)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(pairs))
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return [path_for_pair(pair) for pair in pairs]
+
+    context = multiprocessing.get_context("fork")
+    chunksize = max(1, len(pairs) // (workers * 4))
+    with context.Pool(workers) as pool:
+        return pool.map(path_for_pair, pairs, chunksize=chunksize)
+
+
+def path_for_pair(pair):
+    source, target = pair
+    return shortest_path(source, target, bidirectional=True)
+
+
+def person_id_for_name(name, interactive=True):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    If `interactive` is false, ambiguous names return None
+    instead of prompting.
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
+        if not interactive:
+            return None
         print(f"Which '{name}'?")
         for person_id in person_ids:
             person = people[person_id]
@@ -171,6 +801,11 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return {
+            (graph.movie_ids[m], graph.person_ids[p])
+            for m, p in graph.neighbors(graph.person_index[person_id])
+        }
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -0,0 +1,480 @@
+import threading
+from array import array
+from collections import OrderedDict
+
+ITEMSIZE = array("i").itemsize
+
+# Number of single-source tables kept by each graph
+TABLE_CACHE_SIZE = 16
+
+# Number of people whose recent search work is kept by each graph
+SEARCH_WORK_SIZE = 4096
+
+
+class CompactGraph():
+    """
+    Co-star graph with person and movie ids interned to dense ints.
+
+    Adjacency is kept in CSR form: the movies of person `p` are
+    `person_movies[person_offsets[p]:person_offsets[p + 1]]`, and the
+    stars of movie `m` are `movie_people[movie_offsets[m]:movie_offsets[m + 1]]`.
+    """
+
+    def __init__(self, person_ids, movie_ids,
+                 person_offsets, person_movies,
+                 movie_offsets, movie_people,
+                 person_index=None, movie_index=None):
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+
+        # Mappings from ids to indices, built here unless given
+        if person_index is None:
+            person_index = {pid: i for i, pid in enumerate(person_ids)}
+        if movie_index is None:
+            movie_index = {mid: i for i, mid in enumerate(movie_ids)}
+        self.person_index = person_index
+        self.movie_index = movie_index
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+
+        # Connected component of each person, set by find_components
+        self.component = None
+        self.component_sizes = None
+
+        # Recently used single-source tables, least recent first, and
+        # the states searched so far in queries involving recent people
+        # without a table
+        self.tables = OrderedDict()
+        self.search_work = OrderedDict()
+        self.tables_lock = threading.Lock()
+
+        # Parent array pairs left unreached by finished searches
+        self.scratch = []
+        self.scratch_lock = threading.Lock()
+
+    @classmethod
+    def from_stars(cls, person_ids, movie_ids, stars):
+        """
+        Build a graph from lists of person and movie ids and an iterable
+        of (person_id, movie_id) pairs. Pairs naming an unknown person
+        or movie are skipped.
+        """
+        person_index = {pid: i for i, pid in enumerate(person_ids)}
+        movie_index = {mid: i for i, mid in enumerate(movie_ids)}
+
+        edge_people = array("i")
+        edge_movies = array("i")
+        for person_id, movie_id in stars:
+            p = person_index.get(person_id)
+            m = movie_index.get(movie_id)
+            if p is None or m is None:
+                continue
+            edge_people.append(p)
+            edge_movies.append(m)
+
+        return cls.from_edges(person_ids, movie_ids, edge_people, edge_movies)
+
+    @classmethod
+    def from_edges(cls, person_ids, movie_ids, edge_people, edge_movies):
+        """
+        Build a graph from star links already given as parallel
+        person and movie index arrays.
+        """
+        person_offsets, person_movies = csr(
+            len(person_ids), edge_people, edge_movies
+        )
+        movie_offsets, movie_people = csr(
+            len(movie_ids), edge_movies, edge_people
+        )
+        return cls(list(person_ids), list(movie_ids),
+                   person_offsets, person_movies,
+                   movie_offsets, movie_people)
+
+    def arrays(self):
+        """
+        Return the CSR arrays in the order the constructor takes them.
+        """
+        return [self.person_offsets, self.person_movies,
+                self.movie_offsets, self.movie_people]
+
+    def num_people(self):
+        return len(self.person_offsets) - 1
+
+    def movies_for(self, p):
+        return self.person_movies[self.person_offsets[p]:self.person_offsets[p + 1]]
+
+    def stars_for(self, m):
+        return self.movie_people[self.movie_offsets[m]:self.movie_offsets[m + 1]]
+
+    def neighbors(self, p):
+        """
+        Yield (movie, person) index pairs for people who starred with `p`.
+        """
+        for m in self.movies_for(p):
+            for q in self.stars_for(m):
+                yield m, q
+
+    def find_components(self):
+        """
+        Label each person with a connected component using union-find
+        over the stars of every movie.
+
+        Sets `component` (a dense component number per person) and
+        `component_sizes` (the number of people in each component).
+        """
+        n = self.num_people()
+        parent = array("i", range(n))
+        size = array("i", [1]) * n
+
+        def find(p):
+            while parent[p] != p:
+                parent[p] = parent[parent[p]]
+                p = parent[p]
+            return p
+
+        for m in range(len(self.movie_offsets) - 1):
+            stars = self.stars_for(m)
+            if len(stars) < 2:
+                continue
+            root = find(stars[0])
+            for q in stars[1:]:
+                other = find(q)
+                if other == root:
+                    continue
+                if size[other] > size[root]:
+                    root, other = other, root
+                parent[other] = root
+                size[root] += size[other]
+
+        component = array("i", [-1]) * n
+        component_sizes = array("i")
+        for p in range(n):
+            root = find(p)
+            if component[root] == -1:
+                component[root] = len(component_sizes)
+                component_sizes.append(size[root])
+            component[p] = component[root]
+
+        self.component = component
+        self.component_sizes = component_sizes
+
+    def maybe_connected(self, source, target):
+        """
+        Return False if `source` and `target` are known to be in
+        different components, True otherwise.
+        """
+        if self.component is None:
+            return True
+        return self.component[source] == self.component[target]
+
+    def single_source(self, source, stats=None):
+        """
+        Breadth-first search from `source` to every reachable person.
+
+        Returns (distance, parent_person, parent_movie) arrays indexed
+        by person, where distance is -1 for unreachable people and the
+        parents give the step taken to reach each person.
+        If `stats` is a dict, search counters are stored in it.
+        """
+        if stats is not None:
+            stats["states_explored"] = 0
+            stats["peak_frontier"] = 1
+        n = self.num_people()
+        distance = array("i", [-1]) * n
+        parent_person = array("i", [-1]) * n
+        parent_movie = array("i", [-1]) * n
+        seen_movies = bytearray(len(self.movie_offsets) - 1)
+
+        distance[source] = 0
+        frontier = [source]
+        depth = 0
+        while frontier:
+            if stats is not None:
+                stats["states_explored"] += len(frontier)
+                stats["peak_frontier"] = max(stats["peak_frontier"],
+                                             len(frontier))
+            depth += 1
+            next_frontier = []
+            for p in frontier:
+                for m in self.movies_for(p):
+                    if seen_movies[m]:
+                        continue
+                    seen_movies[m] = 1
+                    for q in self.stars_for(m):
+                        if distance[q] == -1:
+                            distance[q] = depth
+                            parent_person[q] = p
+                            parent_movie[q] = m
+                            next_frontier.append(q)
+            frontier = next_frontier
+
+        return distance, parent_person, parent_movie
+
+    def distance_table(self, source, stats=None):
+        """
+        Return `single_source(source)`, reusing a recently computed table.
+        If `stats` is a dict, the counters of any search are stored in it.
+        """
+        table = self.cached_table(source)
+        if table is None:
+            table = self.single_source(source, stats)
+            with self.tables_lock:
+                self.tables[source] = table
+                if len(self.tables) > TABLE_CACHE_SIZE:
+                    self.tables.popitem(last=False)
+        return table
+
+    def cached_table(self, source):
+        """
+        Return the cached table for `source`, or None if there is none.
+        """
+        with self.tables_lock:
+            table = self.tables.get(source)
+            if table is not None:
+                self.tables.move_to_end(source)
+        return table
+
+    def record_work(self, person, states=0):
+        """
+        Add `states` to the search work of queries involving `person`
+        and return their recent total.
+        """
+        with self.tables_lock:
+            work = self.search_work.pop(person, 0) + states
+            self.search_work[person] = work
+            if len(self.search_work) > SEARCH_WORK_SIZE:
+                self.search_work.popitem(last=False)
+        return work
+
+    def build_table(self, source, stats=None):
+        """
+        Build and cache the table for `source`, starting their search
+        work over so an evicted table is not rebuilt on the next query.
+        """
+        with self.tables_lock:
+            self.search_work.pop(source, None)
+        return self.distance_table(source, stats)
+
+    def clear_tables(self):
+        """
+        Forget every cached table and all recorded search work.
+        """
+        with self.tables_lock:
+            self.tables.clear()
+            self.search_work.clear()
+
+    def path_from_table(self, table, target):
+        """
+        Follow predecessors in a single-source table back from `target`.
+
+        Returns (movie, person) index pairs from the table's source,
+        or None if `target` was not reached.
+        """
+        distance, parent_person, parent_movie = table
+        if distance[target] == -1:
+            return None
+        path = []
+        p = target
+        while distance[p] != 0:
+            path.append((parent_movie[p], p))
+            p = parent_person[p]
+        path.reverse()
+        return path
+
+    def path_between(self, source, target, stats=None):
+        """
+        Return a shortest path as (movie, person) index pairs, answering
+        from a cached table for either end before searching.
+
+        Tables are built by `distance_table`, and also for a person once
+        searches involving them have explored as many states as there
+        are people: a table costs about one such search, so by then it
+        has paid for itself, while occasional repeats never build one.
+        """
+        if stats is None:
+            stats = {}
+        stats["states_explored"] = 0
+        stats["peak_frontier"] = 0
+
+        source_table = self.cached_table(source)
+        target_table = None
+        if source_table is None:
+            target_table = self.cached_table(target)
+        if source_table is None and target_table is None:
+            n = self.num_people()
+            if self.record_work(source) >= n:
+                source_table = self.build_table(source, stats)
+            elif self.record_work(target) >= n:
+                target_table = self.build_table(target, stats)
+            else:
+                path = self.shortest_path(source, target, stats)
+                for person in (source, target):
+                    self.record_work(person, stats["states_explored"])
+                return path
+
+        if source_table is not None:
+            return self.path_from_table(source_table, target)
+
+        reverse = self.path_from_table(target_table, source)
+        if reverse is None:
+            return None
+
+        # Walk the path from target back to source
+        people = [target] + [p for _, p in reverse[:-1]]
+        return [
+            (movie, person)
+            for (movie, _), person in zip(reversed(reverse), reversed(people))
+        ]
+
+    def shortest_path(self, source, target, stats=None):
+        """
+        Bidirectional breadth-first search over person indices.
+
+        Returns a list of (movie, person) index pairs leading from
+        `source` to `target`, or None if they are not connected.
+        If `stats` is a dict, search counters are stored in it.
+        """
+        if stats is not None:
+            stats["states_explored"] = 0
+            stats["peak_frontier"] = 0
+        if source == target:
+            return []
+
+        sides = []
+        for start in (source, target):
+            parent_person, parent_movie = self.take_arrays()
+            parent_person[start] = start
+            sides.append({
+                "frontier": [start],
+                "reached": [[start]],
+                "person": parent_person,
+                "movie": parent_movie,
+                "seen_movies": set()
+            })
+
+        # Arrays of a search that raised are dropped rather than reused,
+        # since their reached lists may be incomplete
+        path = self.search(source, target, sides, stats)
+        for side in sides:
+            self.return_arrays(side)
+        return path
+
+    def search(self, source, target, sides, stats):
+        """
+        Expand the smaller frontier of `sides` until they meet.
+        """
+        forward, backward = sides
+        while forward["frontier"] and backward["frontier"]:
+            if len(forward["frontier"]) <= len(backward["frontier"]):
+                side, other = forward, backward
+            else:
+                side, other = backward, forward
+            if stats is not None:
+                stats["states_explored"] += len(side["frontier"])
+            meeting = self.expand_level(side, other)
+            if stats is not None:
+                stats["peak_frontier"] = max(
+                    stats["peak_frontier"],
+                    len(forward["frontier"]) + len(backward["frontier"])
+                )
+            if meeting is not None:
+                return self.join_paths(meeting, source, target, forward, backward)
+
+        return None
+
+    def take_arrays(self):
+        """
+        Return a (parent_person, parent_movie) pair with every person
+        unreached, reusing one left by a finished search if possible.
+
+        Allocating person-sized arrays costs more than most searches,
+        which meet within a few levels.
+        """
+        with self.scratch_lock:
+            if self.scratch:
+                return self.scratch.pop()
+        n = self.num_people()
+        return array("i", [-1]) * n, array("i", [-1]) * n
+
+    def return_arrays(self, side):
+        """
+        Unreach the people `side` reached and keep its arrays for reuse.
+        """
+        parent_person = side["person"]
+        parent_movie = side["movie"]
+        for level in side["reached"]:
+            for p in level:
+                parent_person[p] = -1
+                parent_movie[p] = -1
+        with self.scratch_lock:
+            self.scratch.append((parent_person, parent_movie))
+
+    def expand_level(self, side, other):
+        """
+        Replace `side`'s frontier with the next level of the search.
+        Returns the first person also reached by `other`, if any.
+        """
+        parent_person = side["person"]
+        parent_movie = side["movie"]
+        seen_movies = side["seen_movies"]
+        other_person = other["person"]
+
+        next_frontier = []
+        for p in side["frontier"]:
+            for m in self.movies_for(p):
+
+                # Every star of an expanded movie has already been reached
+                if m in seen_movies:
+                    continue
+                seen_movies.add(m)
+
+                for q in self.stars_for(m):
+                    if parent_person[q] != -1:
+                        continue
+                    parent_person[q] = p
+                    parent_movie[q] = m
+                    if other_person[q] != -1:
+                        side["frontier"] = next_frontier
+                        side["reached"].extend([next_frontier, [q]])
+                        return q
+                    next_frontier.append(q)
+
+        side["frontier"] = next_frontier
+        side["reached"].append(next_frontier)
+        return None
+
+    def join_paths(self, meeting, source, target, forward, backward):
+        path = []
+        p = meeting
+        while p != source:
+            path.append((forward["movie"][p], p))
+            p = forward["person"][p]
+        path.reverse()
+
+        p = meeting
+        while p != target:
+            following = backward["person"][p]
+            path.append((backward["movie"][p], following))
+            p = following
+        return path
+
+
+def csr(size, rows, cols):
+    """
+    Group `cols` by `rows` into CSR offsets and values arrays,
+    where rows are ints in range(size).
+    """
+    offsets = array("i", [0]) * (size + 1)
+    for r in rows:
+        offsets[r + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    values = array("i", [0]) * len(cols)
+    position = array("i", offsets)
+    for r, c in zip(rows, cols):
+        values[position[r]] = c
+        position[r] += 1
+    return offsets, values
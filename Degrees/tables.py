@@ -0,0 +1,153 @@
+from array import array
+from collections.abc import Mapping, Sequence
+
+
+class StringTable(Sequence):
+    """
+    Read-only list of strings stored as one UTF-8 blob, where string `i`
+    is `blob[offsets[i]:offsets[i + 1]]`. Both may be memory-mapped, and
+    strings are only decoded when accessed.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    @staticmethod
+    def pack(strings):
+        """
+        Return the (offsets, blob) pair for a list of strings, as an int64
+        array and bytes.
+        """
+        offsets = array("q", [0])
+        parts = []
+        for s in strings:
+            data = s.encode("utf-8")
+            parts.append(data)
+            offsets.append(offsets[-1] + len(data))
+        return offsets, b"".join(parts)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+class SortedIndex(Mapping):
+    """
+    Map strings to their positions in a StringTable, by binary search over
+    `order`, the table's positions sorted by `key(string)`.
+
+    Several positions may share a key; `positions` returns all of them,
+    while looking up a key returns the first.
+    """
+
+    def __init__(self, table, order, key=None):
+        self.table = table
+        self.order = order
+        self.key = key
+
+    @staticmethod
+    def sort(strings, key=None):
+        """
+        Return the int array `order` for a list of strings.
+        """
+        if key is None:
+            return array("i", sorted(range(len(strings)), key=strings.__getitem__))
+        return array("i", sorted(range(len(strings)),
+                                 key=lambda i: key(strings[i])))
+
+    def sort_key(self, i):
+        s = self.table[self.order[i]]
+        return s if self.key is None else self.key(s)
+
+    def lower_bound(self, key):
+        low, high = 0, len(self.order)
+        while low < high:
+            middle = (low + high) // 2
+            if self.sort_key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def positions(self, key):
+        """
+        Return the table positions of every string with this key.
+        """
+        i = self.lower_bound(key)
+        found = []
+        while i < len(self.order) and self.sort_key(i) == key:
+            found.append(self.order[i])
+            i += 1
+        return found
+
+    def __getitem__(self, key):
+        i = self.lower_bound(key)
+        if i == len(self.order) or self.sort_key(i) != key:
+            raise KeyError(key)
+        return self.order[i]
+
+    def __iter__(self):
+        previous = None
+        for i in range(len(self.order)):
+            key = self.sort_key(i)
+            if i == 0 or key != previous:
+                yield key
+            previous = key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class Records(Mapping):
+    """
+    Map ids to records, as dicts built on access from string tables of
+    each field, indexed like `ids`.
+    """
+
+    def __init__(self, ids, index, fields):
+        self.ids = ids
+        self.index = index
+        self.fields = fields
+
+    def __getitem__(self, record_id):
+        i = self.index[record_id]
+        return {field: table[i] for field, table in self.fields.items()}
+
+    def __contains__(self, record_id):
+        return record_id in self.index
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class NameIndex(Mapping):
+    """
+    Map lowercase names to the set of ids of people with that name,
+    from a SortedIndex over names keyed by `str.lower`.
+    """
+
+    def __init__(self, ids, name_index):
+        self.ids = ids
+        self.name_index = name_index
+
+    def __getitem__(self, name):
+        positions = self.name_index.positions(name)
+        if not positions:
+            raise KeyError(name)
+        return {self.ids[i] for i in positions}
+
+    def __iter__(self):
+        return iter(self.name_index)
+
+    def __len__(self):
+        return len(self.name_index)
@@ -1,5 +1,10 @@
+import argparse
+import bisect
 import csv
 import itertools
+import math
+import multiprocessing
+import random
 import sys
 
 PROBS = {
@@ -37,15 +42,102 @@ PROBS = {
 }
 
 
+# Number of copies of the gene a person can have
+GENES = (2, 1, 0)
+
+# Samples drawn by the sampling engine, unless a target error is given
+SAMPLES = 10000
+
+# Most samples drawn while trying to reach a target standard error
+MAX_SAMPLES = 10 ** 7
+
+# Samples drawn together by likelihood weighting, one list per person
+BATCH_SIZE = 1000
+
+# Gibbs sampling chains run side by side, and sweeps discarded from each
+CHAINS = 100
+BURN_IN = 50
+
+# Engines that take a sample budget and a target standard error
+SAMPLERS = ("weighting", "gibbs")
+
+# Engines that can run in several processes with --workers
+PARALLEL = ("enumerate", "pruned")
+
+# Partial assignments numbered for each shard, to balance the shards
+SHARD_PREFIXES = 4
+
+
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+    parser = argparse.ArgumentParser(
+        usage="python heredity.py data.csv [--engine ENGINE] "
+              "[--samples N] [--target-error E] [--seed SEED] "
+              "[--workers N]"
+    )
+    parser.add_argument("data")
+    parser.add_argument("--engine", choices=list(ENGINES), default="pruned",
+                        help="inference engine (default: pruned)")
+    parser.add_argument("--samples", type=int,
+                        help=f"samples drawn by the sampling engines "
+                             f"(default: {SAMPLES})")
+    parser.add_argument("--target-error", type=float,
+                        help="sample until every gene probability has "
+                             "at most this standard error")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes used by the enumerate and pruned "
+                             "engines (default: 1)")
+    args = parser.parse_args()
+    if args.samples is not None and args.samples < 1:
+        parser.error("--samples must be at least 1")
+    if args.target_error is not None and not args.target_error > 0:
+        parser.error("--target-error must be positive")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1 and args.engine not in PARALLEL:
+        parser.error(f"--workers is not supported by --engine {args.engine}")
+    if args.engine not in SAMPLERS:
+        for option, value in (("--samples", args.samples),
+                              ("--target-error", args.target_error),
+                              ("--seed", args.seed)):
+            if value is not None:
+                parser.error(
+                    f"{option} is not supported by --engine {args.engine}"
+                )
+    people = load_data(args.data)
+
+    if args.engine in SAMPLERS:
+        samples = args.samples
+        if samples is None:
+            samples = SAMPLES if args.target_error is None else MAX_SAMPLES
+        stats = dict()
+        probabilities = ENGINES[args.engine](
+            people, samples, args.target_error, args.seed, stats
+        )
+        print(f"Drew {stats['samples']} samples, largest standard error "
+              f"{stats['error']:.4f}", file=sys.stderr)
+    elif args.engine in PARALLEL:
+        probabilities = ENGINES[args.engine](people, args.workers)
+    else:
+        probabilities = ENGINES[args.engine](people)
 
-    # Keep track of gene and trait probabilities for each person
-    probabilities = {
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def empty_probabilities(people):
+    """
+    Return a gene and trait probability table of zeros for `people`.
+    """
+    return {
         person: {
             "gene": {
                 2: 0,
@@ -60,8 +152,47 @@ def main():
         for person in people
     }
 
+
+def enumerate_probabilities(people, workers=1):
+    """
+    Compute each person's gene and trait distributions by summing
+    `joint_probability` over every assignment consistent with the evidence.
+
+    If `workers` is more than 1, the assignments are split into that many
+    shards by `enumerate_shard`, summed in a pool of forked processes,
+    and the shards' tables are added together before normalizing.
+    """
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        probabilities = enumerate_shard(people)
+    else:
+        context = multiprocessing.get_context("fork")
+        with context.Pool(workers) as pool:
+            tables = pool.starmap(enumerate_shard, [
+                (people, shard, workers) for shard in range(workers)
+            ])
+        probabilities = empty_probabilities(people)
+        for table in tables:
+            merge(probabilities, table)
+
+    # Ensure probabilities sum to 1
+    normalize(probabilities)
+    return probabilities
+
+
+def enumerate_shard(people, shard=0, shards=1):
+    """
+    Return an unnormalized probability table summing `joint_probability`
+    over one of `shards` shares of the assignments: those whose position
+    among the (have_trait, one_gene) pairs leaves remainder `shard` when
+    divided by `shards`.
+    """
+    # Keep track of gene and trait probabilities for each person
+    probabilities = empty_probabilities(people)
+
     # Loop over all sets of people who might have the trait
     names = set(people)
+    family = compile_family(people)
+    position = 0
     for have_trait in powerset(names):
 
         # Check if current set of people violates known information
@@ -73,25 +204,408 @@ def main():
         if fails_evidence:
             continue
 
-        # Loop over all sets of people who might have the gene
         for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
-
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
+            position += 1
+            if position % shards != shard:
+                continue
+
+            # Score each set of people who might have two genes
+            gene_sets = powerset(names - one_gene)
+            scores = score_assignments(family, [
+                encode(family, one_gene, two_genes, have_trait)
+                for two_genes in gene_sets
+            ])
+
+            # Update probabilities with new joint probability
+            for two_genes, p in zip(gene_sets, scores):
                 update(probabilities, one_gene, two_genes, have_trait, p)
 
-    # Ensure probabilities sum to 1
-    normalize(probabilities)
+    return probabilities
 
-    # Print results
-    for person in people:
-        print(f"{person}:")
+
+def merge(probabilities, table):
+    """
+    Add every gene and trait probability in `table` to `probabilities`.
+    """
+    for person in probabilities:
         for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
             for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+                probabilities[person][field][value] += table[person][field][value]
+
+
+def pruned_probabilities(people, workers=1):
+    """
+    Compute each person's gene and trait distributions by summing over
+    gene assignments one at a time, as `gene_assignments` generates them.
+
+    Traits are never enumerated: observed traits weight each assignment,
+    and unobserved traits are summed out from each person's gene totals.
+    If `workers` is more than 1, the assignments are split into that many
+    shards by `pruned_shard`, summed in a pool of forked processes, and
+    the shards' totals are added together.
+    """
+    names, _ = compile_family(people)
+    evidence = [people[name]["trait"] for name in names]
+
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        totals = pruned_shard(people)
+    else:
+        context = multiprocessing.get_context("fork")
+        with context.Pool(workers) as pool:
+            shards = pool.starmap(pruned_shard, [
+                (people, shard, workers) for shard in range(workers)
+            ])
+        totals = [
+            [sum(shard[i][g] for shard in shards) for g in range(3)]
+            for i in range(len(names))
+        ]
+    return gene_probabilities(people, names, evidence, totals)
+
+
+def pruned_shard(people, shard=0, shards=1):
+    """
+    Return the total probability of each person, in family order,
+    having each number of genes, over one of `shards` shares of the
+    gene assignments chosen by `gene_assignments`.
+    """
+    family = compile_family(people)
+    names, _ = family
+    evidence = [people[name]["trait"] for name in names]
+
+    totals = [[0, 0, 0] for _ in names]
+    for genes, p in gene_assignments(family, evidence, shard, shards):
+        for i, g in enumerate(genes):
+            totals[i][g] += p
+    return totals
+
+
+def gene_assignments(family, evidence, shard=0, shards=1):
+    """
+    Yield each assignment of gene counts to the family, in family order,
+    with its probability of occurring along with the observed traits.
+
+    Assignments are built depth first, parents before children, and a
+    partial assignment is abandoned as soon as its probability is zero,
+    so inconsistent branches are never extended.
+
+    To split the assignments into `shards` shares, the consistent
+    assignments to the first few people are numbered as they are
+    reached, and only those whose number leaves remainder `shard`
+    when divided by `shards` are extended.
+    """
+    names, parents = family
+    n = len(names)
+    if n == 0:
+        if shard == 0:
+            yield (), 1
+        return
+
+    # Number prefixes at a depth with several for every shard
+    split = 1
+    while split < n and 3 ** split < SHARD_PREFIXES * shards:
+        split += 1
+    position = 0
+
+    unconditional = [PROBS["gene"][g] for g in range(3)]
+    weight = [
+        [1 if e is None else PROBS["trait"][g][e] for g in range(3)]
+        for e in evidence
+    ]
+
+    # Current assignment, the probability of each prefix of it,
+    # and the gene counts still to try for each person
+    genes = [0] * n
+    prefix = [1] * (n + 1)
+    options = [iter(GENES)] + [None] * (n - 1)
+    i = 0
+    while i >= 0:
+        g = next(options[i], None)
+        if g is None:
+            i -= 1
+            continue
+
+        pair = parents[i]
+        if pair is None:
+            p = unconditional[g]
+        else:
+            p = INHERITANCE[genes[pair[0]]][genes[pair[1]]][g]
+        p *= prefix[i] * weight[i][g]
+        if p == 0:
+            continue
+
+        if i == split - 1:
+            position += 1
+            if position % shards != shard:
+                continue
+
+        genes[i] = g
+        if i == n - 1:
+            yield tuple(genes), p
+        else:
+            prefix[i + 1] = p
+            i += 1
+            options[i] = iter(GENES)
+
+
+def weighted_probabilities(people, samples=SAMPLES, target_error=None,
+                           seed=None, stats=None):
+    """
+    Estimate each person's gene and trait distributions by likelihood
+    weighting: gene counts are sampled parents first, and each sample
+    is weighted by the probability of the observed traits.
+
+    Samples are drawn BATCH_SIZE at a time until `samples` have been
+    drawn or, if `target_error` is given, until the standard error of
+    every estimated gene probability is at most `target_error`.
+    If `stats` is a dict, the number of samples drawn and the largest
+    standard error are stored in it.
+    """
+    if samples < 1:
+        raise ValueError("Sampling needs a budget of at least one sample")
+    rng = random.Random(seed)
+    names, parents = compile_family(people)
+    evidence = [people[name]["trait"] for name in names]
+
+    # Weighted counts of each gene count for each person, with squared
+    # weights for the standard error
+    totals = [[0, 0, 0] for _ in names]
+    squares = [[0, 0, 0] for _ in names]
+    weight_total = 0
+    square_total = 0
+    drawn = 0
+    error = math.inf
+
+    while drawn < samples:
+        size = min(BATCH_SIZE, samples - drawn)
+        columns, weights = forward_sample(parents, evidence, size, rng)
+        for i, column in enumerate(columns):
+            for g, w in zip(column, weights):
+                totals[i][g] += w
+                squares[i][g] += w * w
+        weight_total += sum(weights)
+        square_total += sum(w * w for w in weights)
+        drawn += size
+
+        error = weighted_error(totals, squares, weight_total, square_total)
+        if target_error is not None and error <= target_error:
+            break
+
+    if weight_total == 0:
+        raise ValueError("No sample was consistent with the observed traits")
+    if stats is not None:
+        stats["samples"] = drawn
+        stats["error"] = error
+    return gene_probabilities(people, names, evidence, totals)
+
+
+def gibbs_probabilities(people, samples=SAMPLES, target_error=None,
+                        seed=None, stats=None, chains=CHAINS, burn_in=BURN_IN):
+    """
+    Estimate each person's gene and trait distributions by Gibbs sampling.
+
+    `chains` independent chains start from gene counts sampled parents
+    first, then each sweep resamples every person's gene count given
+    their parents, children and observed trait. After `burn_in` sweeps,
+    every sweep adds each person's conditional gene distribution to the
+    estimates, until `samples` chain states have been counted or, if
+    `target_error` is given, until the standard error of every gene
+    probability, measured between chains, is at most `target_error`.
+    If `stats` is a dict, the number of samples counted and the largest
+    standard error are stored in it.
+    """
+    if samples < 1:
+        raise ValueError("Sampling needs a budget of at least one sample")
+    rng = random.Random(seed)
+    names, parents = compile_family(people)
+    evidence = [people[name]["trait"] for name in names]
+    genes, _ = forward_sample(parents, evidence, chains, rng)
+
+    # For each person, a table of their weight on each gene count given
+    # their parents' gene counts, and for each child a table of the
+    # child's probability given the other parent's and the child's
+    # gene counts, with the gene counts to look both up in
+    unknown = [0] * chains
+    priors = []
+    roles = [[] for _ in names]
+    for i, pair in enumerate(parents):
+        weight = [
+            1 if evidence[i] is None else PROBS["trait"][g][evidence[i]]
+            for g in range(3)
+        ]
+        if pair is None:
+            prior = tuple(PROBS["gene"][g] * weight[g] for g in range(3))
+            priors.append([[prior] * 3] * 3)
+            continue
+        priors.append([
+            [tuple(INHERITANCE[m][f][g] * weight[g] for g in range(3))
+             for f in range(3)]
+            for m in range(3)
+        ])
+        mother, father = pair
+        if mother == father:
+            table = [[tuple(INHERITANCE[g][g][c] for g in range(3))
+                      for c in range(3)]] * 3
+            roles[mother].append((table, unknown, genes[i]))
+            continue
+        roles[mother].append((CHILD_GIVEN_MOTHER, genes[father], genes[i]))
+        roles[father].append((CHILD_GIVEN_FATHER, genes[mother], genes[i]))
+
+    # Sums of conditional gene distributions by chain, person and gene count
+    totals = [[[0, 0, 0] for _ in names] for _ in range(chains)]
+    sweeps = 0
+    counted = 0
+    error = math.inf
+
+    while counted < samples:
+        keep = sweeps >= burn_in
+        for i, pair in enumerate(parents):
+            column = genes[i]
+            mothers, fathers = (
+                (unknown, unknown) if pair is None
+                else (genes[pair[0]], genes[pair[1]])
+            )
+            prior = priors[i]
+            for k in range(chains):
+                p0, p1, p2 = prior[mothers[k]][fathers[k]]
+                for table, others, kids in roles[i]:
+                    q0, q1, q2 = table[others[k]][kids[k]]
+                    p0 *= q0
+                    p1 *= q1
+                    p2 *= q2
+                total = p0 + p1 + p2
+                u = rng.random() * total
+                column[k] = 0 if u < p0 else 1 if u < p0 + p1 else 2
+                if keep:
+                    person_totals = totals[k][i]
+                    person_totals[0] += p0 / total
+                    person_totals[1] += p1 / total
+                    person_totals[2] += p2 / total
+        sweeps += 1
+
+        if keep:
+            counted += chains
+            error = chain_error(totals, sweeps - burn_in)
+            if target_error is not None and error <= target_error:
+                break
+
+    combined = [
+        [sum(totals[k][i][g] for k in range(chains)) for g in range(3)]
+        for i in range(len(names))
+    ]
+    if stats is not None:
+        stats["samples"] = counted
+        stats["error"] = error
+    return gene_probabilities(people, names, evidence, combined)
+
+
+def forward_sample(parents, evidence, size, rng):
+    """
+    Sample `size` assignments of gene counts, parents first.
+
+    Return a list with each person's gene counts across the samples,
+    in family order, and each sample's probability of the observed
+    traits given its gene counts.
+    """
+    root = cumulative([PROBS["gene"][g] for g in range(3)])
+    inherited = [
+        [cumulative(INHERITANCE[m][f]) for f in range(3)]
+        for m in range(3)
+    ]
+
+    weights = [1] * size
+    columns = []
+    for i, pair in enumerate(parents):
+        draws = [rng.random() for _ in range(size)]
+        if pair is None:
+            column = [draw(root, u) for u in draws]
+        else:
+            mothers = columns[pair[0]]
+            fathers = columns[pair[1]]
+            column = [
+                draw(inherited[m][f], u)
+                for m, f, u in zip(mothers, fathers, draws)
+            ]
+        if evidence[i] is not None:
+            trait = [PROBS["trait"][g][evidence[i]] for g in range(3)]
+            weights = [w * trait[g] for w, g in zip(weights, column)]
+        columns.append(column)
+    return columns, weights
+
+
+def cumulative(distribution):
+    """
+    Return the running totals of `distribution`, ending at exactly 1.
+    """
+    totals = list(itertools.accumulate(distribution))
+    totals[-1] = 1
+    return totals
+
+
+def draw(totals, u):
+    """
+    Return the value whose cumulative probability range contains `u`.
+    """
+    return bisect.bisect_right(totals, u)
+
+
+def weighted_error(totals, squares, weight_total, square_total):
+    """
+    Return the largest standard error among the weighted estimates of
+    each person's gene probabilities.
+    """
+    if weight_total == 0:
+        return math.inf
+    largest = 0
+    for person_totals, person_squares in zip(totals, squares):
+        for total, square in zip(person_totals, person_squares):
+            estimate = total / weight_total
+            variance = (square * (1 - 2 * estimate)
+                        + estimate ** 2 * square_total)
+            largest = max(largest, math.sqrt(max(variance, 0)) / weight_total)
+    return largest
+
+
+def chain_error(totals, sweeps):
+    """
+    Return the largest standard error of the gene probabilities
+    estimated from each chain's `totals` over `sweeps` sweeps.
+    """
+    chains = len(totals)
+    if chains < 2:
+        return math.inf
+    largest = 0
+    for i in range(len(totals[0])):
+        for g in range(3):
+            estimates = [totals[k][i][g] / sweeps for k in range(chains)]
+            mean = sum(estimates) / chains
+            variance = sum((x - mean) ** 2 for x in estimates) / (chains - 1)
+            largest = max(largest, math.sqrt(variance / chains))
+    return largest
+
+
+def gene_probabilities(people, names, evidence, totals):
+    """
+    Return normalized gene and trait distributions for `people` from
+    each person's total weight on each gene count, in family order.
+
+    Unobserved traits are summed out of the gene totals, and observed
+    traits take all of their person's weight.
+    """
+    probabilities = empty_probabilities(people)
+    for i, name in enumerate(names):
+        for g in GENES:
+            probabilities[name]["gene"][g] = totals[i][g]
+            if evidence[i] is None:
+                for value in (True, False):
+                    probabilities[name]["trait"][value] += (
+                        totals[i][g] * PROBS["trait"][g][value]
+                    )
+            else:
+                probabilities[name]["trait"][evidence[i]] += totals[i][g]
+
+    # Ensure probabilities sum to 1
+    normalize(probabilities)
+    return probabilities
 
 
 def load_data(filename):
@@ -139,170 +653,91 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
     """
-    #desc = people.values()
-    #desclist = list(desc)
-    zero_gene = set()
-    no_trait = set()
-
-    for parent in people.keys():
-        if parent not in one_gene and parent not in two_genes:
-            zero_gene.add(parent)
-    
-    for name in people.keys():
-        if name not in have_trait:
-            no_trait.add(name)
-
-
-
-    prob_genes = dict()
-    prob_traits = dict()
-    joint = float(1)
-    final = dict()
-    #mutation = PROBS['mutation']
-    #anti_mutation = 1-PROBS['mutation']
-
-    #for people[name] in desclist:        
-    for name in people.keys():
-        prob_genes[name] = float(1)
-        prob_traits[name] = float(1)
-        final[name] = float(1)
-
-        m0 = False
-        m1 = False
-        m2 = False
-
-        f0 = False
-        f1 = False
-        f2 = False
-
-        m0 = people[name]['mother'] in zero_gene
-        m1 = people[name]['mother'] in one_gene
-        m2 = people[name]['mother'] in two_genes
-
-        f0 = people[name]['father'] in zero_gene
-        f1 = people[name]['father'] in one_gene
-        f2 = people[name]['father'] in two_genes
-
-        #one_gene Heir Inheritance Probability: For all possible pair of parents genes
-
-        if name in one_gene:
-            #Parents
-            if (people[name]['mother'] == None or people[name]['father'] == None):
-                prob_genes[name] = PROBS['gene'][1]
-
-            #Heir
-            # mother = 0, father = 0 or mother = 2, father = 2
-            if (m0 and f0) == True or (m2 and f2) == True:
-                prob_genes[name] = (PROBS['mutation']*(1-PROBS['mutation'])) + ((1-PROBS['mutation'])*PROBS['mutation'])
-
-            # mother = 0, father = 1 or mother = 1, father = 0
-            if (m0 and f1) == True or (m1 and f0) == True:                
-                prob_genes[name] = (PROBS['mutation']*0.5) + ((1-PROBS['mutation'])*0.5)
-
-            # mother = 0, father = 2 or mother = 2, father = 0
-            if (m0 and f2) == True or (m2 and f0) == True:
-                prob_genes[name] = (PROBS['mutation']*PROBS['mutation']) + ((1-PROBS['mutation'])*(1-PROBS['mutation']))
-
-            # mother = 1, father = 2 or mother = 2, father = 1
-            if (m1 and f2) == True or (m2 and f1) == True:
-                prob_genes[name] = (0.5*PROBS['mutation']) + (0.5*(1-PROBS['mutation']))
-
-            # mother = 1, father = 1
-            if (m1 and f1) == True:
-                prob_genes[name] = (0.5*0.5) + (0.5*0.5)
-
-            #have_trait
-            if name in have_trait:
-                prob_traits[name] = PROBS['trait'][1][True]
-            if name in no_trait:
-                prob_traits[name] = PROBS['trait'][1][False]
-        
-        #two_gene Heir Inheritance Probability: For all possible pair of parents genes
-        if name in two_genes:
-            #Parents
-            if people[name]['mother'] == None or people[name]['father'] == None:
-                prob_genes[name] = PROBS['gene'][2]
-            
-            #Heir
-            # mother = 0, father = 0
-            if (m0 and f0) == True:
-                prob_genes[name] = PROBS['mutation']*(PROBS['mutation'])
-
-            # mother = 0, father = 1 or mother = 1, father = 0
-            if (m0 and f1) == True or (m1 and f0) == True:                
-                prob_genes[name] = PROBS['mutation']*0.5
-
-            # mother = 0, father = 2 or mother = 2, father = 0
-            if (m0 and f2) == True or (m2 and f0) == True:
-                prob_genes[name] = PROBS['mutation']*(1-PROBS['mutation'])
-
-            # mother = 1, father = 2 or mother = 2, father = 1
-            if (m1 and f2) == True or (m2 and f1) == True:
-                prob_genes[name] = 0.5*(1-PROBS['mutation'])
-
-            # mother = 1, father = 1
-            if (m1 and f1) == True:
-                prob_genes[name] = 0.5*0.5
-
-            #mother = 2, father = 2
-            if (m2 and f2) == True:
-                prob_genes[name] = (1-PROBS['mutation'])*(1-PROBS['mutation'])
-
-            if name in have_trait:
-                prob_traits[name] = PROBS['trait'][2][True]
-            if name in no_trait:
-                prob_traits[name] = PROBS['trait'][2][False]
-
-        #zero_gene Heir Inheritance Probability: For all possible pair of parents genes
-        if name in zero_gene:
-            
-            #Parents
-            if people[name]['mother'] == None or people[name]['father'] == None:
-                prob_genes[name] = PROBS['gene'][0]
-
-            #Heir
-            # mother = 0, father = 0
-            if (m0 and f0) == True:
-                prob_genes[name] = (1-PROBS['mutation'])*(1-PROBS['mutation'])
-
-            # mother = 0, father = 1 or mother = 1, father = 0
-            if (m0 and f1) == True or (m1 and f0) == True:                
-                prob_genes[name] = (1-PROBS['mutation'])*0.5
-
-            # mother = 0, father = 2 or mother = 2, father = 0
-            if (m0 and f2) == True or (m2 and f0) == True:
-                prob_genes[name] = (1-PROBS['mutation'])*PROBS['mutation']
-
-            # mother = 1, father = 2 or mother = 2, father = 1
-            if (m1 and f2) == True or (m2 and f1) == True:
-                prob_genes[name] = 0.5*PROBS['mutation']
-
-            # mother = 1, father = 1
-            if (m1 and f1) == True:
-                prob_genes[name] = 0.5*0.5
-
-            #mother = 2, father = 2
-            if (m2 and f2) == True:
-                prob_genes[name] = PROBS['mutation']*PROBS['mutation']
-
-            if name in have_trait:
-                prob_traits[name] = PROBS['trait'][0][True]
-            if name in no_trait:
-                prob_traits[name] = PROBS['trait'][0][False]
-        
-        #print("prob_genes: ", prob_genes)
-        #print("prob_traits: ", prob_traits)
-        final[name] = prob_traits[name]*prob_genes[name]
-
-        #print("final: ", final)
-    
-    for name in final:
-        previous = joint
-        joint = final[name]*previous
-        
-        #print("joint: ", joint)
-    
-    return joint
+    family = compile_family(people)
+    return score_assignments(
+        family, [encode(family, one_gene, two_genes, have_trait)]
+    )[0]
+
+
+def compile_family(people):
+    """
+    Return the family as a tuple of its names, ordered so parents come
+    before their children, and for each person the positions of their
+    mother and father in that order, or None if their parents are unknown.
+    """
+    names = []
+    placed = set()
+
+    # Depth-first with an explicit stack, since pedigrees can be deeper
+    # than the recursion limit: a person is placed once both parents are
+    for name in people:
+        stack = [name]
+        while stack:
+            current = stack[-1]
+            if current in placed:
+                stack.pop()
+                continue
+            waiting = [
+                parent for parent in (people[current]["father"],
+                                      people[current]["mother"])
+                if parent is not None and parent not in placed
+            ]
+            if waiting:
+                stack.extend(waiting)
+            else:
+                stack.pop()
+                placed.add(current)
+                names.append(current)
+    index = {name: i for i, name in enumerate(names)}
+    parents = []
+    for name in names:
+        mother = people[name]["mother"]
+        father = people[name]["father"]
+        if mother is None or father is None:
+            parents.append(None)
+        else:
+            parents.append((index[mother], index[father]))
+    return names, parents
+
+
+def encode(family, one_gene, two_genes, have_trait):
+    """
+    Return an assignment as a tuple of each person's gene count and a
+    tuple of whether each person has the trait, in family order.
+    """
+    names, _ = family
+    genes = tuple(
+        2 if name in two_genes else 1 if name in one_gene else 0
+        for name in names
+    )
+    traits = tuple(name in have_trait for name in names)
+    return genes, traits
+
+
+def score_assignments(family, assignments):
+    """
+    Return the joint probability of each encoded assignment, scoring
+    one assignment at a time by lookups in precomputed probability tables.
+    """
+    _, parents = family
+    unconditional = [PROBS["gene"][genes] for genes in range(3)]
+    trait = [
+        [PROBS["trait"][genes][False], PROBS["trait"][genes][True]]
+        for genes in range(3)
+    ]
+
+    scores = []
+    for genes, traits in assignments:
+        p = 1
+        for i, pair in enumerate(parents):
+            g = genes[i]
+            if pair is None:
+                p *= unconditional[g]
+            else:
+                p *= INHERITANCE[genes[pair[0]]][genes[pair[1]]][g]
+            p *= trait[g][traits[i]]
+        scores.append(p)
+    return scores
 
 
 def update(probabilities, one_gene, two_genes, have_trait, p):
@@ -350,5 +785,248 @@ def normalize(probabilities):
 
 
 
+def elimination_probabilities(people):
+    """
+    Compute each person's gene and trait distributions exactly by
+    message passing over the family's Bayesian network.
+
+    Each person's gene count depends on their parents' gene counts, and
+    their trait on their own gene count. Observed traits are folded into
+    the gene factors, so only gene variables are eliminated. Eliminating
+    them in order builds a junction tree of clusters; one pass up the tree
+    and one pass down give every person's marginal, in time linear in the
+    family's size for families shaped like trees.
+    """
+    order = elimination_order(people)
+    position = {person: i for i, person in enumerate(order)}
+
+    # Give each factor to the first of its variables to be eliminated
+    buckets = {person: [] for person in order}
+    for person in people:
+        factor = gene_factor(people, person)
+        buckets[min(factor[0], key=position.get)].append(factor)
+
+    # Upward pass: eliminate each variable, passing the result to the
+    # next variable in its cluster to be eliminated
+    parent = dict()
+    children = {person: [] for person in order}
+    upward = dict()
+    for person in order:
+        local = buckets[person] + [upward[child] for child in children[person]]
+        message = normalized(sum_out(multiply(local), person))
+        upward[person] = message
+        parent[person] = None
+        if message[0]:
+            parent[person] = min(message[0], key=position.get)
+            children[parent[person]].append(person)
+
+    # Downward pass: combine everything else in each cluster into a
+    # message for each child, and read off each person's marginal
+    downward = dict()
+    probabilities = empty_probabilities(people)
+    for person in reversed(order):
+        local = list(buckets[person])
+        if parent[person] is not None:
+            local.append(downward[person])
+
+        belief = multiply(local + [upward[child] for child in children[person]])
+        _, table = marginalize(belief, (person,))
+        total = sum(table.values())
+        for (genes,), p in table.items():
+            probabilities[person]["gene"][genes] = p / total
+
+        for child in children[person]:
+            others = local + [
+                upward[sibling] for sibling in children[person] if sibling != child
+            ]
+            downward[child] = normalized(marginalize(multiply(others), upward[child][0]))
+
+    # Unobserved traits follow from the gene distribution
+    for person in people:
+        trait = people[person]["trait"]
+        for value in (True, False):
+            if trait is None:
+                probabilities[person]["trait"][value] = sum(
+                    probabilities[person]["gene"][genes] * PROBS["trait"][genes][value]
+                    for genes in GENES
+                )
+            else:
+                probabilities[person]["trait"][value] = 1 if trait == value else 0
+    return probabilities
+
+
+def elimination_order(people):
+    """
+    Return an order in which to eliminate people's gene variables,
+    greedily choosing the person with the fewest neighbours in the
+    network linking each child with both parents.
+    """
+    neighbors = {person: set() for person in people}
+    for person in people:
+        family = {person, people[person]["mother"], people[person]["father"]} - {None}
+        for member in family:
+            neighbors[member].update(family - {member})
+
+    order = []
+    while neighbors:
+        person = min(neighbors, key=lambda p: (len(neighbors[p]), p))
+        adjacent = neighbors.pop(person)
+        for other in adjacent:
+            neighbors[other].discard(person)
+            neighbors[other].update(adjacent - {other})
+        order.append(person)
+    return order
+
+
+def inherit_probability(genes):
+    """
+    Return the probability that a parent with `genes` copies of the
+    gene passes one on to their child, allowing for mutation.
+    """
+    if genes == 2:
+        return 1 - PROBS["mutation"]
+    if genes == 1:
+        return 0.5
+    return PROBS["mutation"]
+
+
+def child_probability(genes, mother, father):
+    """
+    Return the probability that a child of parents with `mother` and
+    `father` copies of the gene has `genes` copies.
+    """
+    from_mother = inherit_probability(mother)
+    from_father = inherit_probability(father)
+    if genes == 2:
+        return from_mother * from_father
+    if genes == 1:
+        return from_mother * (1 - from_father) + (1 - from_mother) * from_father
+    return (1 - from_mother) * (1 - from_father)
+
+
+def inheritance_table():
+    """
+    Return a 3x3x3 table where entry [mother][father][child] is the
+    probability of a child having `child` copies of the gene given
+    their parents' copies.
+    """
+    return [
+        [
+            [child_probability(child, mother, father) for child in range(3)]
+            for father in range(3)
+        ]
+        for mother in range(3)
+    ]
+
+
+def gene_factor(people, person):
+    """
+    Return the factor for `person`'s gene count given their parents',
+    weighted by the likelihood of their trait if it is known.
+
+    A factor is a tuple of (variables, table), where the table maps each
+    tuple of gene counts for the variables to a value.
+    """
+    mother = people[person]["mother"]
+    father = people[person]["father"]
+    trait = people[person]["trait"]
+
+    def evidence(genes):
+        return 1 if trait is None else PROBS["trait"][genes][trait]
+
+    if mother is None or father is None:
+        return (person,), {
+            (genes,): PROBS["gene"][genes] * evidence(genes)
+            for genes in GENES
+        }
+    return (person, mother, father), {
+        (genes, m, f): INHERITANCE[m][f][genes] * evidence(genes)
+        for genes, m, f in itertools.product(GENES, repeat=3)
+    }
+
+
+def multiply(factors):
+    """
+    Return the product of `factors` as a single factor.
+    """
+    variables = []
+    for factor_variables, _ in factors:
+        for variable in factor_variables:
+            if variable not in variables:
+                variables.append(variable)
+
+    table = dict()
+    for assignment in itertools.product(GENES, repeat=len(variables)):
+        values = dict(zip(variables, assignment))
+        p = 1
+        for factor_variables, factor_table in factors:
+            p *= factor_table[tuple(values[v] for v in factor_variables)]
+        table[assignment] = p
+    return tuple(variables), table
+
+
+def sum_out(factor, variable):
+    """
+    Return `factor` with `variable` summed out.
+    """
+    variables, table = factor
+    position = variables.index(variable)
+    summed = dict()
+    for assignment, p in table.items():
+        key = assignment[:position] + assignment[position + 1:]
+        summed[key] = summed.get(key, 0) + p
+    return variables[:position] + variables[position + 1:], summed
+
+
+def marginalize(factor, variables):
+    """
+    Return `factor` summed down to (or extended with constant
+    values up to) exactly `variables`.
+    """
+    keep = set(variables)
+    for variable in factor[0]:
+        if variable not in keep:
+            factor = sum_out(factor, variable)
+    ones = (tuple(variables), {
+        assignment: 1
+        for assignment in itertools.product(GENES, repeat=len(variables))
+    })
+    return multiply([ones, factor])
+
+
+def normalized(factor):
+    """
+    Return `factor` scaled so its values sum to 1.
+    """
+    variables, table = factor
+    total = sum(table.values())
+    if total == 0:
+        return factor
+    return variables, {assignment: p / total for assignment, p in table.items()}
+
+
+# Child gene probabilities given parents' genes, built once from PROBS
+INHERITANCE = inheritance_table()
+
+# The same probabilities as [other parent][child] -> one per parent's genes
+CHILD_GIVEN_MOTHER = [
+    [tuple(INHERITANCE[g][f][c] for g in range(3)) for c in range(3)]
+    for f in range(3)
+]
+CHILD_GIVEN_FATHER = [
+    [tuple(INHERITANCE[m][g][c] for g in range(3)) for c in range(3)]
+    for m in range(3)
+]
+
+# Inference engines by name, for --engine
+ENGINES = {
+    "enumerate": enumerate_probabilities,
+    "pruned": pruned_probabilities,
+    "weighting": weighted_probabilities,
+    "gibbs": gibbs_probabilities,
+    "elimination": elimination_probabilities
+}
+
+
 if __name__ == "__main__":
     main()
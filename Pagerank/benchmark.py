@@ -0,0 +1,237 @@
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import outofcore
+import solvers
+from pagerank import (DAMPING, SAMPLES, batch_sample_pagerank,
+                      iterate_pagerank, matrix_pagerank, sample_pagerank)
+
+# Tolerance of the reference solution each engine is compared against
+REFERENCE_TOLERANCE = 1e-12
+
+# Standard errors a sampling engine's mean may be from the reference, for
+# any of its pages, plus the rounding of sample_pagerank to 4 places
+BIAS_ERRORS = 5
+BIAS_ROUNDING = 5e-5
+
+# Engines timed on every corpus, in order
+ENGINES = [
+    "sample", "parallel-sample", "batch-sample", "iterate", "matrix",
+    "gauss-seidel", "quadratic", "adaptive", "out-of-core"
+]
+
+FIELDS = [
+    "pages", "links", "engine", "seconds", "pages_per_second",
+    "max_error", "l1_error", "peak_memory_bytes"
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time PageRank engines on synthetic power-law graphs."
+    )
+    parser.add_argument("--sizes", default="1000,10000",
+                        help="comma-separated numbers of pages")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--samples", type=int, default=SAMPLES,
+                        help="samples taken by the sampling engines")
+    parser.add_argument("--engine", action="append", choices=ENGINES,
+                        help="only run these engines (default: all)")
+    parser.add_argument("--memory", action="store_true",
+                        help="re-run each engine under tracemalloc for peak memory")
+    parser.add_argument("--html", metavar="DIRECTORY",
+                        help="also write each synthetic corpus as HTML pages here")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="processes used by the parallel-sample engine")
+    parser.add_argument("--bias", type=int, metavar="SEEDS",
+                        help="only check that the sampling engines' mean over "
+                             "this many seeds matches the reference ranks")
+    parser.add_argument("--output", default="benchmark.csv")
+    args = parser.parse_args()
+
+    if args.bias:
+        for size in [int(s) for s in args.sizes.split(",")]:
+            corpus = power_law_corpus(size, args.seed)
+            for name, bias, error in sampling_bias(
+                    corpus, args.samples, args.bias, args.workers):
+                print(f"{size:>9} {name:<15} bias {bias:.2e}"
+                      f" (standard error {error:.2e})"
+                      f"{'' if bias <= bias_limit(error) else '  BIASED'}")
+        return
+
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for size in [int(s) for s in args.sizes.split(",")]:
+            corpus = power_law_corpus(size, args.seed)
+            if args.html:
+                write_corpus(corpus, os.path.join(args.html, f"synthetic{size}"))
+            for row in run(corpus, args.engine, args.samples, args.memory,
+                           args.workers):
+                writer.writerow(row)
+                f.flush()
+                print(f"{row['pages']:>9} {row['engine']:<15}"
+                      f" {row['seconds']:9.3f}s"
+                      f" {row['pages_per_second']:12.0f} pages/s"
+                      f" max error {row['max_error']:.2e}", file=sys.stderr)
+    print(f"Results written to {args.output}.", file=sys.stderr)
+
+
+def power_law_corpus(n, seed=0, mean_links=8, exponent=2.1):
+    """
+    Return a corpus of `n` pages with power-law distributed links.
+
+    Out-degrees follow a Pareto distribution with the given `exponent`,
+    and targets are chosen by preferential attachment, so in-degrees
+    are heavy-tailed too. Some pages get no links at all.
+    """
+    rng = random.Random(seed)
+    pages = [f"{i}.html" for i in range(n)]
+    corpus = {page: set() for page in pages}
+
+    # Every chosen target is added again, so popular pages grow more popular
+    targets = []
+    scale = mean_links * (exponent - 2) / (exponent - 1)
+    for i, page in enumerate(pages):
+        degree = min(int(scale * rng.paretovariate(exponent - 1)), n - 1)
+        for _ in range(degree):
+            if targets and rng.random() < 0.8:
+                link = targets[rng.randrange(len(targets))]
+            else:
+                link = pages[rng.randrange(n)]
+            if link != page:
+                corpus[page].add(link)
+                targets.append(link)
+    return corpus
+
+
+def write_corpus(corpus, directory):
+    """
+    Write `corpus` as a directory of HTML pages that `crawl` can read.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for page, links in corpus.items():
+        with open(os.path.join(directory, page), "w") as f:
+            f.write("<!DOCTYPE html>\n<html>\n<body>\n")
+            for link in sorted(links):
+                f.write(f'<a href="{link}">{link}</a>\n')
+            f.write("</body>\n</html>\n")
+
+
+def sampling_bias(corpus, samples, seeds, workers):
+    """
+    Run each sampling engine with seeds 0 to `seeds` - 1 and yield its
+    name, the difference between its mean rank and the reference rank
+    for the page furthest outside `bias_limit`, and the standard error
+    of that mean.
+    """
+    reference = matrix_pagerank(corpus, DAMPING, REFERENCE_TOLERANCE)
+    samplers = {
+        "sample": lambda seed: sample_pagerank(
+            corpus, DAMPING, samples, seed=seed
+        ),
+        "parallel-sample": lambda seed: sample_pagerank(
+            corpus, DAMPING, samples, workers=workers, seed=seed
+        ),
+        "batch-sample": lambda seed: batch_sample_pagerank(
+            corpus, DAMPING, samples, seed=seed
+        )
+    }
+    for name, sampler in samplers.items():
+        runs = [sampler(seed) for seed in range(seeds)]
+        worst = None
+        for page in reference:
+            values = [ranks[page] for ranks in runs]
+            mean = sum(values) / seeds
+            variance = sum((v - mean) ** 2 for v in values) / max(seeds - 1, 1)
+            bias = abs(mean - reference[page])
+            error = (variance / seeds) ** 0.5
+            if worst is None or bias - bias_limit(error) > (
+                    worst[0] - bias_limit(worst[1])):
+                worst = (bias, error)
+        yield name, worst[0], worst[1]
+
+
+def bias_limit(error):
+    """
+    Return the largest bias allowed for a mean with standard error `error`.
+    """
+    return BIAS_ERRORS * error + BIAS_ROUNDING
+
+
+def engines(samples, workers=4):
+    """
+    Return a dictionary of engine names to functions of a corpus.
+    """
+    return {
+        "sample": lambda corpus: sample_pagerank(corpus, DAMPING, samples),
+        "parallel-sample": lambda corpus: sample_pagerank(
+            corpus, DAMPING, samples, workers=workers
+        ),
+        "batch-sample": lambda corpus: batch_sample_pagerank(
+            corpus, DAMPING, samples, seed=0
+        ),
+        "iterate": lambda corpus: iterate_pagerank(corpus, DAMPING),
+        "matrix": lambda corpus: matrix_pagerank(corpus, DAMPING),
+        "gauss-seidel": lambda corpus: solvers.solve(corpus, DAMPING, "gauss-seidel"),
+        "quadratic": lambda corpus: solvers.solve(corpus, DAMPING, "quadratic"),
+        "adaptive": lambda corpus: solvers.solve(corpus, DAMPING, "adaptive"),
+        "out-of-core": out_of_core
+    }
+
+
+def out_of_core(corpus):
+    """
+    Rank `corpus` through an on-disk edge list, including writing it.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        write_corpus(corpus, directory)
+        prefix = os.path.join(directory, "graph")
+        outofcore.write_edge_list(directory, prefix)
+        return outofcore.outofcore_pagerank(prefix, DAMPING)
+
+
+def run(corpus, only, samples, memory, workers=4):
+    """
+    Yield a result row for every engine allowed to run on `corpus`.
+    """
+    reference = matrix_pagerank(corpus, DAMPING, REFERENCE_TOLERANCE)
+    n = len(corpus)
+    links = sum(len(corpus[page]) for page in corpus)
+
+    for name, engine in engines(samples, workers).items():
+        if only and name not in only:
+            continue
+
+        start = time.perf_counter()
+        ranks = engine(corpus)
+        seconds = time.perf_counter() - start
+
+        peak = ""
+        if memory:
+            tracemalloc.start()
+            engine(corpus)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        errors = [abs(ranks[page] - reference[page]) for page in reference]
+        yield {
+            "pages": n,
+            "links": links,
+            "engine": name,
+            "seconds": seconds,
+            "pages_per_second": n / seconds if seconds > 0 else 0,
+            "max_error": max(errors),
+            "l1_error": sum(errors),
+            "peak_memory_bytes": peak
+        }
+
+
+if __name__ == "__main__":
+    main()
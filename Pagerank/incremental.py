@@ -0,0 +1,150 @@
+import json
+import os
+import sys
+
+from pagerank import DAMPING, filter_links, matrix_pagerank, parse_page
+
+# Rank store kept inside the corpus directory by default
+STORE_FILE = ".pagerank.json"
+STORE_VERSION = 1
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python incremental.py corpus [store]")
+    directory = sys.argv[1]
+    store_path = sys.argv[2] if len(sys.argv) == 3 else None
+
+    stats = dict()
+    ranks = update_pagerank(directory, DAMPING, store_path, stats)
+    print(f"Re-parsed {stats['parsed']} of {len(ranks)} pages, "
+          f"{stats['removed']} removed, "
+          f"{stats['iterations']} iterations")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+def update_pagerank(directory, damping_factor, store_path=None, stats=None):
+    """
+    Return PageRank values for the corpus in `directory`, reusing the
+    rank store from the previous run.
+
+    Only pages whose modification time or size changed are re-parsed,
+    and power iteration starts from the previous ranks. The store is
+    then updated with the new links and ranks. If `stats` is a dict,
+    the number of pages parsed and removed and the number of
+    iterations are stored in it.
+    """
+    if store_path is None:
+        store_path = os.path.join(directory, STORE_FILE)
+    store = load_store(store_path)
+
+    files, parsed, removed = recrawl(directory, store["files"])
+    corpus = filter_links(
+        {filename: set(entry["links"]) for filename, entry in files.items()}
+    )
+
+    # Ranks from a different damping factor are still a better start than 1/N
+    initial = store["ranks"] or None
+    iteration_stats = dict()
+    ranks = matrix_pagerank(
+        corpus, damping_factor, initial=initial, stats=iteration_stats
+    )
+
+    save_store(store_path, {
+        "version": STORE_VERSION,
+        "damping": damping_factor,
+        "files": files,
+        "ranks": ranks
+    })
+    if stats is not None:
+        stats["parsed"] = parsed
+        stats["removed"] = removed
+        stats["iterations"] = iteration_stats["iterations"]
+    return ranks
+
+
+def recrawl(directory, files):
+    """
+    Return an updated copy of the store's `files` entries for the HTML
+    pages in `directory`, along with the number of pages parsed and the
+    number of stored pages no longer present.
+
+    Entries hold each page's modification time, size and raw links;
+    unchanged pages keep their stored links without being read.
+    """
+    updated = dict()
+    parsed = 0
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".html") or not entry.is_file():
+            continue
+        stat = entry.stat()
+        previous = files.get(entry.name)
+        if (previous is not None
+                and previous["mtime_ns"] == stat.st_mtime_ns
+                and previous["size"] == stat.st_size):
+            updated[entry.name] = previous
+            continue
+        _, links = parse_page(entry.path)
+        updated[entry.name] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "links": sorted(links)
+        }
+        parsed += 1
+
+    removed = sum(1 for filename in files if filename not in updated)
+    return updated, parsed, removed
+
+
+def apply_changes(corpus, added_links=(), removed_links=(), removed_pages=()):
+    """
+    Return a copy of `corpus` with (page, link) pairs added or removed
+    and pages removed. Pages named in `added_links` are created if new.
+
+    The result can be ranked with `matrix_pagerank(..., initial=ranks)`
+    to warm-start from the ranks of the unchanged corpus.
+    """
+    corpus = {page: set(links) for page, links in corpus.items()}
+    for page, link in added_links:
+        corpus.setdefault(page, set())
+        corpus.setdefault(link, set())
+        if link != page:
+            corpus[page].add(link)
+    for page, link in removed_links:
+        if page in corpus:
+            corpus[page].discard(link)
+    for page in removed_pages:
+        corpus.pop(page, None)
+    for page in corpus:
+        corpus[page] &= corpus.keys()
+    return corpus
+
+
+def load_store(path):
+    """
+    Return the rank store at `path`, or an empty store if there is
+    none or it was written by a different version.
+    """
+    empty = {"version": STORE_VERSION, "files": dict(), "ranks": dict()}
+    try:
+        with open(path) as f:
+            store = json.load(f)
+    except (OSError, ValueError):
+        return empty
+    if store.get("version") != STORE_VERSION:
+        return empty
+    return store
+
+
+def save_store(path, store):
+    """
+    Write `store` to `path`, replacing any previous store atomically.
+    """
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(store, f)
+    os.replace(f"{path}.tmp", path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import mmap
+import os
+import sys
+from array import array
+
+from pagerank import DAMPING, TOLERANCE, parse_page
+
+# Number of source pages whose edges are streamed from disk at a time
+BLOCK_SIZE = 1 << 16
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python outofcore.py corpus [prefix]")
+    directory = sys.argv[1]
+    prefix = sys.argv[2] if len(sys.argv) == 3 else os.path.join(directory, "graph")
+
+    write_edge_list(directory, prefix)
+    ranks = outofcore_pagerank(prefix, DAMPING)
+    print(f"PageRank Results from Out-of-Core Iteration")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+def write_edge_list(directory, prefix):
+    """
+    Crawl `directory` into an on-disk graph, one page at a time.
+
+    Writes `prefix.pages` (one page name per line, fixing its index),
+    `prefix.offsets` (N + 1 int64 offsets into the edges, by source)
+    and `prefix.edges` (int32 target indices, sorted by source).
+    """
+    pages = sorted(
+        entry.name for entry in os.scandir(directory)
+        if entry.name.endswith(".html") and entry.is_file()
+    )
+    index = {page: i for i, page in enumerate(pages)}
+
+    with open(f"{prefix}.pages", "w", encoding="utf-8",
+              errors="surrogateescape") as f:
+        for page in pages:
+            f.write(page + "\n")
+
+    offsets = array("q", [0])
+    with open(f"{prefix}.edges", "wb") as f:
+        for page in pages:
+            _, links = parse_page(os.path.join(directory, page))
+            targets = array("i", sorted(
+                index[link] for link in links if link in index
+            ))
+            targets.tofile(f)
+            offsets.append(offsets[-1] + len(targets))
+
+    with open(f"{prefix}.offsets", "wb") as f:
+        offsets.tofile(f)
+
+
+def outofcore_pagerank(prefix, damping_factor, tolerance=TOLERANCE,
+                       block_size=BLOCK_SIZE):
+    """
+    Return PageRank values for the graph written by `write_edge_list`,
+    by power iteration that streams the memory-mapped edge list block
+    by block each round, keeping only the rank vectors in memory.
+
+    Matches `matrix_pagerank`: pages without links count as linking to
+    every page, and iteration stops once the L1 change between rounds
+    falls below `tolerance`.
+    """
+    with open(f"{prefix}.pages", encoding="utf-8",
+              errors="surrogateescape") as f:
+        pages = f.read().splitlines()
+    n = len(pages)
+
+    with open(f"{prefix}.offsets", "rb") as offsets_file, \
+            open(f"{prefix}.edges", "rb") as edges_file:
+        offsets = map_array(offsets_file, "q")
+        edges = map_array(edges_file, "i")
+
+        rank = array("d", [1 / n]) * n
+        while True:
+            new_rank = array("d", [0.0]) * n
+            dangling_rank = 0.0
+
+            for block in range(0, n, block_size):
+                stop = min(block + block_size, n)
+                bounds = offsets[block:stop + 1].tolist()
+                targets = edges[bounds[0]:bounds[-1]].tolist()
+                start = bounds[0]
+                for source in range(block, stop):
+                    first = bounds[source - block] - start
+                    last = bounds[source - block + 1] - start
+                    if first == last:
+                        dangling_rank += rank[source]
+                        continue
+                    share = rank[source] / (last - first)
+                    for target in targets[first:last]:
+                        new_rank[target] += share
+
+            base = (1 - damping_factor) / n + damping_factor * dangling_rank / n
+            change = 0.0
+            for i in range(n):
+                value = base + damping_factor * new_rank[i]
+                change += abs(value - rank[i])
+                new_rank[i] = value
+            rank = new_rank
+            if change < tolerance:
+                break
+
+    return dict(zip(pages, rank))
+
+
+def map_array(f, typecode):
+    """
+    Return a read-only memoryview of typed items over the whole of file `f`.
+    """
+    if os.fstat(f.fileno()).st_size == 0:
+        return memoryview(array(typecode))
+    buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(buffer).cast(typecode)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,53 @@
+import mmap
+import multiprocessing
 import os
 import random
 import re
 import sys
-import copy
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+# L1 change between iterations at which matrix_pagerank stops
+TOLERANCE = 1e-10
+
+# Number of independent random surfers used by batch_sample_pagerank
+SURFERS = 256
+
+# Steps each surfer takes before its visits are counted, and the fewest
+# counted samples each surfer is given
+BURN_IN = 100
+
+# Links in an HTML page, matched on raw bytes by parallel_crawl
+LINK_PATTERN = re.compile(rb"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Files at least this many bytes are memory-mapped rather than read
+MMAP_THRESHOLD = 1 << 20
+
 
 def main():
     if len(sys.argv) != 2:
         sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
+    corpus, incoming, out_degree = crawl(sys.argv[1], index=True)
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    ranks = iterate_pagerank(corpus, DAMPING, (incoming, out_degree))
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
 
 
-def crawl(directory):
+def crawl(directory, index=False):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
+
+    If `index` is true, return a tuple of that dictionary, a dictionary
+    mapping each page to the set of pages linking to it, and a dictionary
+    mapping each page to its number of links.
     """
     pages = dict()
 
@@ -39,16 +60,91 @@ def crawl(directory):
             links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
             pages[filename] = set(links) - {filename}
 
+    return filter_links(pages, index)
+
+
+def filter_links(pages, index=False):
+    """
+    Restrict the links in `pages` to pages in the corpus, in one pass,
+    and return them the way `crawl` does.
+    """
     # Only include links to other pages in the corpus
+    incoming = {filename: set() for filename in pages}
+    out_degree = dict()
     for filename in pages:
         pages[filename] = set(
             link for link in pages[filename]
             if link in pages
         )
+        out_degree[filename] = len(pages[filename])
+        for link in pages[filename]:
+            incoming[link].add(filename)
 
+    if index:
+        return pages, incoming, out_degree
     return pages
 
 
+def parallel_crawl(directory, workers=None, index=False):
+    """
+    Parse a directory of HTML pages like `crawl`, spreading the files
+    over a pool of `workers` processes (default: one per CPU).
+
+    Pages are streamed back as they are parsed and large files are
+    memory-mapped rather than read. Return the same result as `crawl`.
+    """
+    paths = [
+        entry.path for entry in os.scandir(directory)
+        if entry.name.endswith(".html") and entry.is_file()
+    ]
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    pages = dict()
+    if workers <= 1 or len(paths) < 2:
+        for filename, links in map(parse_page, paths):
+            pages[filename] = links
+    else:
+        chunksize = max(1, len(paths) // (workers * 8))
+        with multiprocessing.Pool(workers) as pool:
+            for filename, links in pool.imap_unordered(
+                    parse_page, paths, chunksize=chunksize):
+                pages[filename] = links
+
+    return filter_links(pages, index)
+
+
+def parse_page(path):
+    """
+    Return the filename of the HTML page at `path` and the set of
+    other pages it links to.
+    """
+    filename = os.path.basename(path)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size > 0 and size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as contents:
+                links = set(LINK_PATTERN.findall(contents))
+        else:
+            links = set(LINK_PATTERN.findall(f.read()))
+    links = {os.fsdecode(link) for link in links}
+    return filename, links - {filename}
+
+
+def link_index(corpus):
+    """
+    Return the incoming links and out-degree dictionaries that
+    `crawl(directory, index=True)` builds, for an existing corpus.
+    """
+    incoming = {page: set() for page in corpus}
+    out_degree = dict()
+    for page in corpus:
+        out_degree[page] = len(corpus[page])
+        for link in corpus[page]:
+            incoming[link].add(page)
+    return incoming, out_degree
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page to visit next,
@@ -84,50 +180,167 @@ def transition_model(corpus, page, damping_factor):
 
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, workers=1, seed=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
 
+    A single random surfer takes the samples, using a random stream
+    seeded with `seed`. If `workers` is more than 1, the samples are
+    split across that many processes, each running its own surfer with
+    a seed derived from `seed`, and their visit counts are merged.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    page_rank = {}
-    for page in corpus.keys():
-        page_rank[page] = 0
+    pages = sorted(corpus)
+    links = link_table(corpus, pages)
+    if workers > 1:
+        counts = parallel_surf(links, damping_factor, n, workers, seed, surfers=1)
+    else:
+        counts = surf(links, damping_factor, n, 1, seed)
+    return {page: round(counts[i] / n, 4) for i, page in enumerate(pages)}
 
-    # # problem assumes n is at least 1
-    for i in range(1, n):
-        if i == 0:
-            page = random.choice(list(corpus.keys()))
 
-        curr_dist = transition_model(corpus, page, damping_factor)
-        for key in curr_dist.keys():
-            page_rank[key] = page_rank[key] + curr_dist[key]
+def batch_sample_pagerank(corpus, damping_factor, n, surfers=SURFERS, seed=None,
+                          workers=1):
+    """
+    Return PageRank values for each page from `n` samples taken by
+    `surfers` independent random surfers moving in lockstep, each
+    starting on a page at random.
 
-        page_rank_keys = list(curr_dist.keys())
-        page_rank_values = list(curr_dist.values())
+    The transition model only ever picks uniformly among a page's links
+    or among all pages, so each page's table is just a tuple of link
+    indices, built once; choosing a next page costs O(1). `seed` makes
+    the samples reproducible. With `workers` above 1, the samples are
+    split across processes as in `sample_pagerank`.
 
-        #random.choices(sequence, weights=None, cum_weights=None, k=1)
-        page = random.choices(page_rank_keys, weights=page_rank_values)[0]
+    Return a dictionary where keys are page names, and values are
+    the fraction of samples that visited the page.
+    """
+    pages = sorted(corpus)
+    links = link_table(corpus, pages)
 
-    for key in page_rank.keys():
-        page_rank[key] = round(page_rank[key] / n, 4)
+    if workers > 1:
+        counts = parallel_surf(links, damping_factor, n, workers, seed, surfers)
+    else:
+        counts = surf(links, damping_factor, n, surfers, seed)
+    return {page: counts[i] / n for i, page in enumerate(pages)}
 
-    return page_rank        
 
+def link_table(corpus, pages):
+    """
+    Return, for each page in `pages`, a tuple of the indices
+    in `pages` of the pages it links to.
+    """
+    index = {page: i for i, page in enumerate(pages)}
+    return [tuple(index[link] for link in sorted(corpus[page])) for page in pages]
 
 
-def iterate_pagerank(corpus, damping_factor):
+def parallel_surf(links, damping_factor, n, workers, seed, surfers=SURFERS):
+    """
+    Split `n` samples as evenly as possible over `workers` processes
+    running `surf`, each with a seed drawn from a stream seeded with
+    `seed`, and return the summed visit counts.
+    """
+    seeds = random.Random(seed)
+    jobs = []
+    for w in range(workers):
+        share = n // workers + (1 if w < n % workers else 0)
+        if share > 0:
+            jobs.append((share, seeds.getrandbits(64)))
+
+    with multiprocessing.Pool(
+            len(jobs), initializer=set_surf_links, initargs=(links,)) as pool:
+        results = pool.starmap(
+            surf_worker,
+            [(damping_factor, share, surfers, job_seed) for share, job_seed in jobs]
+        )
+
+    counts = [0] * len(links)
+    for result in results:
+        for i, count in enumerate(result):
+            counts[i] += count
+    return counts
+
+
+# Link table each surf worker process receives once from parallel_surf
+surf_links = None
+
+
+def set_surf_links(links):
+    global surf_links
+    surf_links = links
+
+
+def surf_worker(damping_factor, n, surfers, seed):
+    return surf(surf_links, damping_factor, n, surfers, seed)
+
+
+def surf(links, damping_factor, n, surfers, seed):
+    """
+    Take `n` samples of the random surfer over pages numbered by
+    position in `links`, spread across `surfers` surfers, using a
+    random stream seeded with `seed`.
+
+    Each surfer starts on a page at random and takes BURN_IN steps
+    before any visit is counted, so the samples are not biased towards
+    the uniform start. Fewer surfers are used if needed to give each
+    at least BURN_IN counted samples.
+
+    Return a list with the number of visits to each page.
+    """
+    rng = random.Random(seed)
+    rand = rng.random
+    num_pages = len(links)
+    counts = [0] * num_pages
+
+    surfers = max(1, min(surfers, n // BURN_IN))
+    positions = [int(rand() * num_pages) for _ in range(surfers)]
+    for _ in range(BURN_IN):
+        for s in range(surfers):
+            out = links[positions[s]]
+            if out and rand() < damping_factor:
+                positions[s] = out[int(rand() * len(out))]
+            else:
+                positions[s] = int(rand() * num_pages)
+    remaining = n
+
+    while remaining > 0:
+        active = min(surfers, remaining)
+        for s in range(active):
+            out = links[positions[s]]
+            if out and rand() < damping_factor:
+                p = out[int(rand() * len(out))]
+            else:
+                p = int(rand() * num_pages)
+            positions[s] = p
+            counts[p] += 1
+        remaining -= active
+
+    return counts
+
+
+def iterate_pagerank(corpus, damping_factor, index=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
 
+    `index` is the (incoming, out_degree) pair from `crawl` or
+    `link_index`, built here if not given.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
+    if index is None:
+        index = link_index(corpus)
+    incoming, out_degree = index
+
+    # Pages without links count as linking to every page
+    dangling = [page for page in corpus if out_degree[page] == 0]
+
     pagerank = dict()
 
     #initialize 1/N as initial pagerank
@@ -139,18 +352,16 @@ def iterate_pagerank(corpus, damping_factor):
     
     while diverged:
         diverged = False
-        pagerank_iterative = copy.deepcopy(pagerank)
+        pagerank_iterative = dict(pagerank)
+        dangling_rank = sum(pagerank_iterative[i] for i in dangling)/len(corpus)
         
         for x in corpus.keys():
-            pagerank_iteration = 0
+            pagerank_iteration = dangling_rank
 
 
             #summation formula
-            for i in linkedpages(corpus, x):
-                if len(corpus[i]) == 0:
-                    pagerank_iteration += pagerank_iterative[i]/len(corpus)
-                elif len(corpus[i]) != 0:
-                   pagerank_iteration += pagerank_iterative[i]/len(corpus[i])
+            for i in incoming[x]:
+                pagerank_iteration += pagerank_iterative[i]/out_degree[i]
 
 
             pagerank[x] = ((1 - damping_factor)/len(corpus)) + (pagerank_iteration*damping_factor)
@@ -164,6 +375,101 @@ def iterate_pagerank(corpus, damping_factor):
     #raise NotImplementedError
 
 
+def transition_matrix(corpus):
+    """
+    Build the sparse column-stochastic link matrix of `corpus` once.
+
+    Return a dictionary with
+        * "pages": page names, fixing an index for each page,
+        * "rows": for each page, the indices of pages linking to it,
+        * "weights": for each page, 1 / its number of links (0 if none),
+        * "dangling": indices of pages with no links.
+    """
+    pages = sorted(corpus)
+    index = {page: i for i, page in enumerate(pages)}
+    rows = [[] for _ in pages]
+    weights = [0.0] * len(pages)
+    dangling = []
+
+    for page in pages:
+        j = index[page]
+        links = corpus[page]
+        if len(links) == 0:
+            dangling.append(j)
+            continue
+        weights[j] = 1 / len(links)
+        for link in links:
+            rows[index[link]].append(j)
+
+    return {
+        "pages": pages,
+        "rows": rows,
+        "weights": weights,
+        "dangling": dangling
+    }
+
+
+def matrix_pagerank(corpus, damping_factor, tolerance=TOLERANCE, matrix=None,
+                    initial=None, stats=None, teleport=None):
+    """
+    Return PageRank values for each page by power iteration over the
+    sparse link matrix, until the L1 change between iterations falls
+    below `tolerance`.
+
+    Pages with no links are treated as linking to every page (including
+    themselves), as a rank-one correction added to each iteration.
+    Return a dictionary shaped like `iterate_pagerank`'s.
+
+    `initial` may map pages to ranks to start from, such as an earlier
+    result; missing pages start at 1/N. If `stats` is a dict, the number
+    of iterations is stored in it.
+
+    `teleport` may map pages to the probability of jumping to them with
+    probability `1 - damping_factor`, summing to 1, in place of choosing
+    uniformly among all pages. Pages without links still link uniformly.
+    """
+    if matrix is None:
+        matrix = transition_matrix(corpus)
+    rows = matrix["rows"]
+    weights = matrix["weights"]
+    dangling = matrix["dangling"]
+    n = len(rows)
+
+    rank = [1 / n] * n
+    if initial is not None:
+        rank = [initial.get(page, 1 / n) for page in matrix["pages"]]
+        total = sum(rank)
+        if total > 0:
+            rank = [r / total for r in rank]
+        else:
+            rank = [1 / n] * n
+
+    if teleport is None:
+        jump = [(1 - damping_factor) / n] * n
+    else:
+        jump = [(1 - damping_factor) * teleport.get(page, 0) for page in matrix["pages"]]
+
+    iterations = 0
+    while True:
+        iterations += 1
+        scaled = [r * w for r, w in zip(rank, weights)]
+        dangling_rank = sum(rank[j] for j in dangling)
+        base = damping_factor * dangling_rank / n
+
+        new_rank = [
+            base + jump[i] + damping_factor * sum([scaled[j] for j in row])
+            for i, row in enumerate(rows)
+        ]
+        change = sum(abs(a - b) for a, b in zip(new_rank, rank))
+        rank = new_rank
+        if change < tolerance:
+            break
+
+    if stats is not None:
+        stats["iterations"] = iterations
+    return dict(zip(matrix["pages"], rank))
+
+
 def linkedpages(corpus, page):
     linkedpage = set()
 
@@ -0,0 +1,90 @@
+import sys
+from collections import OrderedDict
+
+from pagerank import DAMPING, TOLERANCE, crawl, matrix_pagerank, transition_matrix
+
+# Number of single-seed basis vectors kept by each PersonalizedPageRank
+BASIS_CACHE_SIZE = 128
+
+
+def main():
+    if len(sys.argv) < 3:
+        sys.exit("Usage: python personalized.py corpus seed [seed ...]")
+    ranker = PersonalizedPageRank(crawl(sys.argv[1]), DAMPING)
+    ranks = ranker.rank(sys.argv[2:])
+    print(f"Personalized PageRank Results (seeds: {', '.join(sys.argv[2:])})")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+class PersonalizedPageRank():
+    """
+    PageRank with a custom teleport distribution over one corpus.
+
+    Personalized PageRank is linear in the teleport distribution, so the
+    ranks for a single seed page are computed once and cached as basis
+    vectors; any weighted combination of seeds is answered as the same
+    combination of their basis vectors without iterating again.
+    """
+
+    def __init__(self, corpus, damping_factor, tolerance=TOLERANCE,
+                 cache_size=BASIS_CACHE_SIZE):
+        self.corpus = corpus
+        self.damping_factor = damping_factor
+        self.tolerance = tolerance
+        self.cache_size = cache_size
+        self.matrix = transition_matrix(corpus)
+
+        # Basis vectors by seed page, least recently used first
+        self.basis = OrderedDict()
+
+    def basis_vector(self, page):
+        """
+        Return the ranks when every teleport jumps to `page`.
+        """
+        if page not in self.corpus:
+            raise ValueError(f"Unknown page: {page}")
+        if page in self.basis:
+            self.basis.move_to_end(page)
+            return self.basis[page]
+
+        ranks = matrix_pagerank(
+            self.corpus, self.damping_factor, self.tolerance,
+            matrix=self.matrix, teleport={page: 1}
+        )
+        self.basis[page] = ranks
+        if len(self.basis) > self.cache_size:
+            self.basis.popitem(last=False)
+        return ranks
+
+    def precompute(self, pages):
+        """
+        Compute and cache basis vectors for frequently used seed pages.
+        """
+        for page in pages:
+            self.basis_vector(page)
+
+    def rank(self, teleport):
+        """
+        Return PageRank values for each page when teleports follow
+        `teleport`: either a collection of seed pages, jumped to
+        uniformly, or a dictionary mapping seed pages to weights.
+        """
+        if not isinstance(teleport, dict):
+            teleport = {page: 1 for page in teleport}
+        total = sum(teleport.values())
+        if not teleport or total <= 0:
+            raise ValueError("Teleport distribution needs a positive weight")
+
+        ranks = {page: 0 for page in self.corpus}
+        for seed, weight in teleport.items():
+            if weight == 0:
+                continue
+            share = weight / total
+            for page, value in self.basis_vector(seed).items():
+                ranks[page] += share * value
+        return ranks
+
+
+if __name__ == "__main__":
+    main()
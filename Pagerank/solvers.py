@@ -0,0 +1,331 @@
+import sys
+import time
+
+from pagerank import DAMPING, TOLERANCE, crawl, transition_matrix
+
+# Give up on a solver after this many iterations
+MAX_ITERATIONS = 10000
+
+# Iterations between extrapolation steps
+EXTRAPOLATE_EVERY = 10
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python solvers.py corpus [corpus ...]")
+    for directory in sys.argv[1:]:
+        corpus = crawl(directory)
+        print(f"{directory} ({len(corpus)} pages)")
+        for row in compare(corpus, DAMPING):
+            print(f"  {row['method']:<13} {row['iterations']:>5} iterations"
+                  f"  {row['seconds'] * 1000:9.2f}ms"
+                  f"  max error {row['error']:.2e}")
+
+
+def compare(corpus, damping_factor, tolerance=TOLERANCE):
+    """
+    Run every solver on `corpus` with a shared transition matrix.
+
+    Return a list of dictionaries with each method's iteration count,
+    wall time, residual history and largest difference from Jacobi.
+    """
+    matrix = transition_matrix(corpus)
+    results = []
+    reference = None
+    for method in SOLVERS:
+        history = []
+        start = time.perf_counter()
+        ranks = solve(corpus, damping_factor, method, tolerance, history, matrix)
+        seconds = time.perf_counter() - start
+        if reference is None:
+            reference = ranks
+        results.append({
+            "method": method,
+            "iterations": len(history),
+            "seconds": seconds,
+            "error": max(abs(ranks[page] - reference[page]) for page in ranks),
+            "history": history
+        })
+    return results
+
+
+def solve(corpus, damping_factor, method="jacobi", tolerance=TOLERANCE,
+          history=None, matrix=None):
+    """
+    Return PageRank values for each page using solver `method`, one of
+    the names in SOLVERS, stopping once the L1 change between iterations
+    falls below `tolerance`.
+
+    If `history` is a list, one dictionary per iteration is appended to
+    it with the iteration number, the residual (L1 change) and the
+    seconds elapsed since the solver started.
+    """
+    if method not in SOLVERS:
+        raise ValueError(f"Unknown solver: {method}")
+    if matrix is None:
+        matrix = transition_matrix(corpus)
+
+    n = len(matrix["pages"])
+    rank = [1 / n] * n
+    recorder = Recorder(history)
+    rank = SOLVERS[method](rank, matrix, damping_factor, tolerance, recorder)
+
+    total = sum(rank)
+    return {page: r / total for page, r in zip(matrix["pages"], rank)}
+
+
+class Recorder():
+    """
+    Append per-iteration residuals to a history list, if one was given.
+    """
+
+    def __init__(self, history):
+        self.history = history
+        self.iterations = 0
+        self.start = time.perf_counter()
+
+    def record(self, residual):
+        self.iterations += 1
+        if self.history is not None:
+            self.history.append({
+                "iteration": self.iterations,
+                "residual": residual,
+                "seconds": time.perf_counter() - self.start
+            })
+
+    def exhausted(self):
+        return self.iterations >= MAX_ITERATIONS
+
+
+def power_step(rank, matrix, damping_factor):
+    """
+    Return the next Jacobi (power iteration) step from `rank`.
+    """
+    n = len(rank)
+    scaled = [r * w for r, w in zip(rank, matrix["weights"])]
+    dangling_rank = sum(rank[j] for j in matrix["dangling"])
+    base = (1 - damping_factor) / n + damping_factor * dangling_rank / n
+    return [
+        base + damping_factor * sum([scaled[j] for j in row])
+        for row in matrix["rows"]
+    ]
+
+
+def l1(a, b):
+    return sum(abs(x - y) for x, y in zip(a, b))
+
+
+def jacobi(rank, matrix, damping_factor, tolerance, recorder):
+    """
+    Plain power iteration.
+    """
+    while not recorder.exhausted():
+        new_rank = power_step(rank, matrix, damping_factor)
+        residual = l1(new_rank, rank)
+        rank = new_rank
+        recorder.record(residual)
+        if residual < tolerance:
+            break
+    return rank
+
+
+def gauss_seidel(rank, matrix, damping_factor, tolerance, recorder):
+    """
+    Update ranks in place, so each page already sees the new ranks
+    of pages before it in the same sweep.
+    """
+    rows = matrix["rows"]
+    weights = matrix["weights"]
+    n = len(rank)
+    is_dangling = [False] * n
+    for j in matrix["dangling"]:
+        is_dangling[j] = True
+    dangling_rank = sum(rank[j] for j in matrix["dangling"])
+    teleport = (1 - damping_factor) / n
+
+    previous = list(rank)
+    while not recorder.exhausted():
+        rank = list(rank)
+        for i, row in enumerate(rows):
+            old = rank[i]
+            linked = sum([rank[j] * weights[j] for j in row])
+
+            # A dangling page links to itself too, so solve for its own term
+            if is_dangling[i]:
+                others = (dangling_rank - old) / n
+                new = (teleport + damping_factor * (linked + others)) / (
+                    1 - damping_factor / n
+                )
+                dangling_rank += new - old
+            else:
+                new = teleport + damping_factor * (linked + dangling_rank / n)
+
+            rank[i] = new
+
+        # Sweeps do not preserve total rank, so rescale before comparing
+        total = sum(rank)
+        rank = [r / total for r in rank]
+        dangling_rank = sum(rank[j] for j in matrix["dangling"])
+        residual = l1(rank, previous)
+        previous = rank
+        recorder.record(residual)
+        if residual < tolerance:
+            break
+    return rank
+
+
+def aitken(rank, matrix, damping_factor, tolerance, recorder):
+    """
+    Power iteration with a componentwise Aitken delta-squared
+    extrapolation every EXTRAPOLATE_EVERY iterations.
+    """
+    previous = []
+    while not recorder.exhausted():
+        new_rank = power_step(rank, matrix, damping_factor)
+        residual = l1(new_rank, rank)
+        rank = new_rank
+        recorder.record(residual)
+        if residual < tolerance:
+            break
+
+        previous = (previous + [rank])[-3:]
+        if recorder.iterations % EXTRAPOLATE_EVERY == 0 and len(previous) == 3:
+            x0, x1, x2 = previous
+            extrapolated = []
+            for a, b, c in zip(x0, x1, x2):
+                denominator = c - 2 * b + a
+                if denominator == 0:
+                    extrapolated.append(c)
+                else:
+                    extrapolated.append(a - (b - a) ** 2 / denominator)
+            rank = normalized(extrapolated, rank)
+            previous = []
+    return rank
+
+
+def quadratic(rank, matrix, damping_factor, tolerance, recorder):
+    """
+    Power iteration with quadratic extrapolation every EXTRAPOLATE_EVERY
+    iterations, fitting the last four iterates to the three largest
+    eigenvectors of the link matrix.
+    """
+    previous = []
+    while not recorder.exhausted():
+        new_rank = power_step(rank, matrix, damping_factor)
+        residual = l1(new_rank, rank)
+        rank = new_rank
+        recorder.record(residual)
+        if residual < tolerance:
+            break
+
+        previous = (previous + [rank])[-4:]
+        if recorder.iterations % EXTRAPOLATE_EVERY == 0 and len(previous) == 4:
+            rank = normalized(quadratic_extrapolation(*previous), rank)
+            previous = []
+    return rank
+
+
+def quadratic_extrapolation(x0, x1, x2, x3):
+    """
+    Return the quadratic extrapolation of four successive iterates.
+    """
+    y1 = [b - a for a, b in zip(x0, x1)]
+    y2 = [c - a for a, c in zip(x0, x2)]
+    y3 = [d - a for a, d in zip(x0, x3)]
+
+    # Least squares for [y1 y2] [g1 g2]^T = -y3 via the normal equations
+    a11 = sum(u * u for u in y1)
+    a12 = sum(u * v for u, v in zip(y1, y2))
+    a22 = sum(v * v for v in y2)
+    b1 = -sum(u * w for u, w in zip(y1, y3))
+    b2 = -sum(v * w for v, w in zip(y2, y3))
+    determinant = a11 * a22 - a12 * a12
+    if determinant == 0:
+        return x3
+    g1 = (b1 * a22 - b2 * a12) / determinant
+    g2 = (a11 * b2 - a12 * b1) / determinant
+    g3 = 1.0
+
+    beta0 = g1 + g2 + g3
+    beta1 = g2 + g3
+    beta2 = g3
+    return [
+        beta0 * b + beta1 * c + beta2 * d
+        for b, c, d in zip(x1, x2, x3)
+    ]
+
+
+def adaptive(rank, matrix, damping_factor, tolerance, recorder):
+    """
+    Update only the pages whose rank still needs to change by more than
+    a per-page threshold; pages that have converged cost nothing.
+
+    With uniform teleports and pages without links spreading their rank
+    uniformly, PageRank is the normalized solution of
+    x = (1 - d) / N + d * (links from pages with links) x, so each page
+    keeps the residual of that equation: how much its rank has yet to
+    change. Each iteration pushes every residual above the threshold
+    into its page's rank and along the page's links, so only pages
+    whose residual grew need checking in the next iteration. Iteration
+    stops once every residual is below the threshold, which bounds the
+    L1 error by `tolerance`.
+    """
+    rows = matrix["rows"]
+    weights = matrix["weights"]
+    n = len(rank)
+    links = [[] for _ in range(n)]
+    for i, row in enumerate(rows):
+        for j in row:
+            links[j].append(i)
+
+    rank = list(rank)
+    scaled = [r * w for r, w in zip(rank, weights)]
+    teleport = (1 - damping_factor) / n
+    residual = [
+        teleport + damping_factor * sum([scaled[j] for j in row]) - rank[i]
+        for i, row in enumerate(rows)
+    ]
+    threshold = tolerance * (1 - damping_factor) / n
+
+    active = [i for i in range(n) if abs(residual[i]) > threshold]
+    while active and not recorder.exhausted():
+        pushed = [residual[i] for i in active]
+        touched = set()
+        for i, r in zip(active, pushed):
+            rank[i] += r
+            residual[i] = 0.0
+        for i, r in zip(active, pushed):
+            share = damping_factor * weights[i] * r
+            if share:
+                for j in links[i]:
+                    residual[j] += share
+                touched.update(links[i])
+        recorder.record(sum(abs(r) for r in pushed))
+        active = [j for j in touched if abs(residual[j]) > threshold]
+    return rank
+
+
+def normalized(rank, fallback):
+    """
+    Return `rank` clipped to non-negative values and scaled to sum to 1,
+    or `fallback` if that is not possible.
+    """
+    rank = [max(r, 0.0) for r in rank]
+    total = sum(rank)
+    if total <= 0:
+        return fallback
+    return [r / total for r in rank]
+
+
+# Solvers by name, in the order compare runs them
+SOLVERS = {
+    "jacobi": jacobi,
+    "gauss-seidel": gauss_seidel,
+    "aitken": aitken,
+    "quadratic": quadratic,
+    "adaptive": adaptive
+}
+
+
+if __name__ == "__main__":
+    main()